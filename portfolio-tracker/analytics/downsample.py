@@ -0,0 +1,60 @@
+# downsample.py
+import warnings
+import numpy as np
+
+class Downsampler:
+    """ Reduces chart frames to about one point per pixel before they are sent to the browser """
+    target_points = 800 # half page chart width in pixels
+
+    @staticmethod
+    def lttb(values, target):
+        """ Method to select row indices by Largest-Triangle-Three-Buckets, keeps the visual shape of each (T, N) column """
+        rows = len(values)
+        if rows <= target or target < 3:
+            return np.arange(rows)
+        with warnings.catch_warnings(): # all NaN columns
+            warnings.simplefilter("ignore", RuntimeWarning)
+            values = np.where(np.isnan(values), np.nanmean(values, axis=0, keepdims=True), values) # gaps should not win a bucket
+        values = np.nan_to_num(values)
+        edges = np.linspace(1, rows - 1, target - 1).astype(int) # first & last row are always kept
+        selected = np.zeros((target, values.shape[1]), dtype=int)
+        previous = np.zeros(values.shape[1], dtype=int)
+        columns = np.arange(values.shape[1])
+        for bucket in range(target - 2):
+            start, end = edges[bucket], edges[bucket + 1]
+            next_end = edges[bucket + 2] if bucket + 2 < len(edges) else rows
+            next_x = (end + next_end - 1) / 2
+            next_y = values[end:next_end].mean(axis=0)
+            x = np.arange(start, end)[:, None]
+            area = np.abs((previous - next_x) * (values[start:end] - values[previous, columns])
+                          - (previous - x) * (next_y - values[previous, columns]))
+            previous = start + np.argmax(area, axis=0)
+            selected[bucket + 1] = previous
+        selected[-1] = rows - 1
+        return np.unique(selected)
+
+    @staticmethod
+    def min_max(values, target):
+        """ Method to select the first, lowest & highest row per bucket & column, keeps extremes (returns, volume) visible """
+        rows = len(values)
+        if rows <= target or target < 4:
+            return np.arange(rows)
+        buckets = target // 2
+        edges = np.linspace(0, rows, buckets + 1).astype(int)
+        lowest = np.minimum.reduceat(np.where(np.isnan(values), np.inf, values), edges[:-1], axis=0)
+        highest = np.maximum.reduceat(np.where(np.isnan(values), -np.inf, values), edges[:-1], axis=0)
+        bucket_of_row = np.repeat(np.arange(buckets), np.diff(edges))
+        hits = (values == lowest[bucket_of_row]) | (values == highest[bucket_of_row])
+        return np.unique(np.concatenate([edges[:-1], [rows - 1], np.nonzero(hits.any(axis=1))[0]]))
+
+    @staticmethod
+    def frame(frame, method="lttb", target=None, start=None, end=None, x="Date"):
+        """ Method to cut a chart frame to [start, end] on column x & downsample it ("lttb" or "min_max")
+            a zoom with fewer rows than the target stays at full resolution """
+        if start is not None:
+            frame = frame[frame[x] >= start]
+        if end is not None:
+            frame = frame[frame[x] <= end]
+        values = frame.drop(columns=x).to_numpy(dtype=float)
+        select = Downsampler.lttb if method == "lttb" else Downsampler.min_max
+        return frame.iloc[select(values, target or Downsampler.target_points)]
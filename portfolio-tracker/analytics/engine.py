@@ -0,0 +1,147 @@
+# engine.py
+import warnings
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from market_data.fx_service import FXService
+from market_data.asset_frame import AssetFrame
+
+@dataclass
+class ComparisonResult:
+    """ Metrics of N assets on a shared date index, arrays are ordered like tickers (T = dates, N = assets)
+        Prices & volumes are views into the shared AssetFrame, nothing per asset is copied """
+    frame: AssetFrame          # shared OHLCV columns, tickers & currencies
+    price_type: str            # field of the frame the metrics are based on
+    names: list
+    base_currency: str
+    returns: np.ndarray        # (T, N) simple returns between consecutive trading days of each asset
+    observations: np.ndarray   # (N,) number of returns per asset
+    geo_return: np.ndarray     # (N,) compounded return over the period
+    volatility: np.ndarray     # (N,) standard deviation of returns scaled to the period
+    dividend_yield: np.ndarray # (N,) dividends paid in the period over the first price
+    pe: np.ndarray             # (N,) trailing P/E (latest)
+    sharpe: np.ndarray         # (N,) (geo_return - risk free rate) / volatility
+    correlation: np.ndarray    # (N, N) pairwise correlation of returns
+    fx_rates: np.ndarray       # (T, N) rates converting each asset into base_currency (broadcast if all share it)
+    periods_per_year: object = 252 # bars per year of the frame (scalar or (N,)), annualizes rolling metrics
+
+    @property
+    def tickers(self):
+        return self.frame.tickers
+
+    @property
+    def currencies(self):
+        return self.frame.currencies
+
+    @property
+    def dates(self):
+        """ (T,) datetime64[D], union of all trading days """
+        return self.frame.dates
+
+    @property
+    def prices(self):
+        """ (T, N) selected price in local ccy, NaN where the asset did not trade (view) """
+        return self.frame.column(self.price_type)
+
+    @property
+    def prices_base(self):
+        """ (T, N) selected price converted into base_currency, computed on request """
+        return self.frame.convert(self.price_type, self.fx_rates)
+
+    @property
+    def volumes(self):
+        """ (T, N) traded units (view) """
+        return self.frame.column("Volume")
+
+    @property
+    def nbytes(self):
+        """ Memory held by the result incl. its frame, broadcast fx rates hold none """
+        return self.frame.nbytes + sum(value.nbytes for value in vars(self).values() if isinstance(value, np.ndarray) and value.flags.owndata)
+
+    def axis(self):
+        """ Method to return the dates as python dates, or as datetimes (UTC) for intraday bars """
+        dates = pd.to_datetime(self.dates)
+        return dates.date if self.dates.dtype == np.dtype("datetime64[D]") else dates.to_pydatetime()
+
+    def chart_frame(self, matrix, labels):
+        """ Method to turn a (T, N) array of the result into a frame with a 'Date' column for st.line_chart """
+        frame = pd.DataFrame(matrix, columns=labels)
+        frame["Date"] = pd.Series(self.axis(), dtype=object) # python dates/datetimes, a datetime64 column would break .round
+        return frame.dropna(how="all", subset=labels)
+
+class AnalyticsEngine:
+    """ Batched analytics for N assets on one (T, N) NumPy array instead of per asset pandas calls """
+
+    @staticmethod
+    def forward_fill(matrix):
+        """ Method to forward fill NaN along the date axis """
+        rows = np.where(~np.isnan(matrix), np.arange(len(matrix))[:, None], 0)
+        np.maximum.accumulate(rows, axis=0, out=rows)
+        return matrix[rows, np.arange(matrix.shape[1])]
+
+    @staticmethod
+    def simple_returns(prices):
+        """ Method to calculate returns of every asset against its previous trading day """
+        previous = np.vstack([np.full((1, prices.shape[1]), np.nan), AnalyticsEngine.forward_fill(prices)[:-1]])
+        return prices / previous - 1
+
+    @staticmethod
+    def co_moments(returns):
+        """ Method to calculate the pairwise complete (N, N) sums behind variances & correlations, sums of blocks add up """
+        valid = (~np.isnan(returns)).astype(float)
+        x = np.nan_to_num(returns)
+        n = valid.T @ valid                   # common observations per pair
+        sum_x = x.T @ valid                   # sum of asset i over days where asset j traded
+        sum_xx = (x * x).T @ valid
+        sum_xy = x.T @ x
+        return n, sum_x, sum_xx, sum_xy
+
+    @staticmethod
+    def correlation(returns):
+        """ Method to calculate the pairwise complete correlation matrix with matrix products only """
+        return AnalyticsEngine.correlation_from(AnalyticsEngine.co_moments(returns))
+
+    @staticmethod
+    def correlation_from(moments):
+        """ Method to turn co_moments into the correlation matrix """
+        n, sum_x, sum_xx, sum_xy = moments
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = sum_xy - sum_x * sum_x.T / n
+            var = sum_xx - sum_x ** 2 / n
+            corr = cov / np.sqrt(var * var.T)
+        corr[n < 2] = np.nan
+        return np.clip(corr, -1, 1)
+
+    @staticmethod
+    def compute(frame, infos, price_type, risk_free_rates, fx_histories=None, fx_service=None):
+        """ Method to compute all metrics for the N assets of an AssetFrame in one pass, prices are converted into the currency of the first asset
+            fx_histories: fx base series by currency, see FXService.base_currencies """
+        prices = frame.column(price_type)
+        returns = AnalyticsEngine.simple_returns(prices)
+        observations = (~np.isnan(returns)).sum(axis=0)
+        geo_return = np.where(observations > 0, np.nanprod(1 + returns, axis=0) - 1, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning) # assets without (enough) returns, e.g. a window without bars
+            volatility = np.nanstd(returns, axis=0, ddof=1) * np.sqrt(observations)
+
+        first_price = (prices[np.argmax(~np.isnan(prices), axis=0), np.arange(len(frame.tickers))] if len(prices)
+                       else np.full(len(frame.tickers), np.nan))
+        rates = np.array([np.nan if rate is None else rate for rate in risk_free_rates], dtype=float)
+        years = len(frame.dates) and ((frame.dates[-1] - frame.dates[0]).astype("timedelta64[D]").astype(int) + 1) / 365.25
+        fx_rates = (fx_service or FXService()).conversion_matrix(frame.dates, frame.currencies, frame.currencies[0], fx_histories or {}, price_type)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return ComparisonResult(frame=frame,
+                                    price_type=price_type,
+                                    names=[infos[ticker]["shortName"] for ticker in frame.tickers],
+                                    base_currency=frame.currencies[0],
+                                    returns=returns,
+                                    observations=observations,
+                                    geo_return=geo_return,
+                                    volatility=volatility,
+                                    dividend_yield=np.nansum(frame.column("Dividends"), axis=0) / first_price,
+                                    pe=np.array([infos[ticker]["trailingPE"] for ticker in frame.tickers], dtype=float),
+                                    sharpe=(geo_return - rates) / volatility,
+                                    correlation=AnalyticsEngine.correlation(returns),
+                                    fx_rates=fx_rates,
+                                    periods_per_year=(~np.isnan(prices)).sum(axis=0) / years) # bars traded per year & asset, ~252 equities, ~365 crypto
@@ -0,0 +1,129 @@
+# rolling.py
+from dataclasses import dataclass
+import numpy as np
+
+@dataclass
+class RollingStats:
+    """ Rolling metrics for the rows passed to RollingRisk.extend, arrays are (T, N) """
+    volatility: np.ndarray     # annualized standard deviation of returns
+    sharpe: np.ndarray         # (annualized mean return - risk free rate) / volatility
+    correlation: np.ndarray    # correlation of returns with the reference asset (column 0)
+    drawdown: np.ndarray       # price against the highest price of the window
+    max_drawdown: np.ndarray   # largest drop from a high to a later low within the window
+
+    @property
+    def nbytes(self):
+        """ Memory held by the metrics """
+        return sum(values.nbytes for values in vars(self).values())
+
+class RollingRisk:
+    """ Rolling volatility, correlation, Sharpe & drawdown in O(T) from cumulative sums & block maxima.
+        State is kept between calls, so extending the history by new bars only costs O(window + new bars). """
+    windows = [20, 60, 252]
+    periods_per_year = 252
+
+    def __init__(self, window, risk_free_rates=0.0, min_periods=None, periods_per_year=None):
+        self.window = window
+        self.min_periods = min_periods or max(window // 2, 2) # mixed calendars leave gaps on the shared date index
+        self.periods_per_year = RollingRisk.periods_per_year if periods_per_year is None else np.asarray(periods_per_year, dtype=float) # scalar or per asset
+        self.risk_free_rates = np.nan_to_num(np.asarray(risk_free_rates, dtype=float)) # annual, per asset or scalar
+        self._last_price = None # last known price per asset, to compute the first return of the next block
+        self._returns = None    # last window - 1 rows of returns
+        self._prices = None     # last window - 1 rows of forward filled prices
+
+    @staticmethod
+    def window_sum(values, window):
+        """ Method to sum each row with the window - 1 rows before it, from one cumulative sum """
+        cumulative = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+        start = np.maximum(np.arange(1, len(values) + 1) - window, 0)
+        return cumulative[1:] - cumulative[start]
+
+    @staticmethod
+    def window_max(values, window):
+        """ Method to take the NaN ignoring max of each row & the window - 1 rows before it (van Herk/Gil-Werman) """
+        rows, columns = values.shape
+        blocks = -(-(rows + window - 1) // window)
+        padded = np.full((blocks * window, columns), np.nan)
+        padded[window - 1:window - 1 + rows] = values
+        padded = padded.reshape(blocks, window, columns)
+        prefix = np.fmax.accumulate(padded, axis=1).reshape(-1, columns)              # max from block start up to the row
+        suffix = np.fmax.accumulate(padded[:, ::-1], axis=1)[:, ::-1].reshape(-1, columns) # max from the row up to block end
+        end = np.arange(window - 1, window - 1 + rows)
+        return np.fmax(suffix[end - window + 1], prefix[end])
+
+    @staticmethod
+    def window_max_drawdown(prices, window):
+        """ Method to take the max drawdown within each row & the window - 1 rows before it, i.e. the lowest price / highest
+            earlier price of the same window - 1. A window spans at most two blocks: the worst drop inside the left block (suffix),
+            inside the right block (prefix) & from the left block high to the right block low """
+        rows, columns = prices.shape
+        blocks = -(-(rows + window - 1) // window)
+        padded = np.full((blocks * window, columns), np.nan)
+        padded[window - 1:window - 1 + rows] = prices
+        padded = padded.reshape(blocks, window, columns)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inside_prefix = np.fmin.accumulate(padded / np.fmax.accumulate(padded, axis=1), axis=1).reshape(-1, columns)
+            suffix_low = np.fmin.accumulate(padded[:, ::-1], axis=1)[:, ::-1]
+            inside_suffix = np.fmin.accumulate((suffix_low / padded)[:, ::-1], axis=1)[:, ::-1].reshape(-1, columns)
+            suffix_high = np.fmax.accumulate(padded[:, ::-1], axis=1)[:, ::-1].reshape(-1, columns)
+            prefix_low = np.fmin.accumulate(padded, axis=1).reshape(-1, columns)
+            end = np.arange(window - 1, window - 1 + rows)
+            start = end - window + 1
+            across = np.where((start % window != 0)[:, None], prefix_low[end] / suffix_high[start], np.nan) # window within one block otherwise
+            return np.fmin(np.fmin(inside_suffix[start], inside_prefix[end]), across) - 1
+
+    @staticmethod
+    def forward_fill(values, last):
+        """ Method to forward fill NaN along the rows, starting from the last known values """
+        filled = np.vstack([last[None, :], values])
+        rows = np.where(~np.isnan(filled), np.arange(len(filled))[:, None], 0)
+        np.maximum.accumulate(rows, axis=0, out=rows)
+        return filled[rows, np.arange(filled.shape[1])][1:]
+
+    def _carry(self, tail, block):
+        """ Method to prepend the rows kept from the previous call """
+        return block if tail is None else np.vstack([tail, block])
+
+    def _keep(self, values):
+        return values[max(len(values) - self.window + 1, 0):] if self.window > 1 else values[:0]
+
+    def extend(self, prices):
+        """ Method to append a (T, N) block of prices (NaN where an asset did not trade) & return the rolling metrics of its rows """
+        prices = np.asarray(prices, dtype=float)
+        if self._last_price is None:
+            self._last_price = np.full(prices.shape[1], np.nan)
+        filled = RollingRisk.forward_fill(prices, self._last_price)
+        returns = prices / np.vstack([self._last_price[None, :], filled[:-1]]) - 1
+        self._last_price = filled[-1]
+
+        history = self._carry(self._returns, returns)
+        skip = len(history) - len(returns)
+        valid = ~np.isnan(history)
+        x = np.where(valid, history, 0.0)
+        joint = valid & valid[:, :1]                         # days where the asset & the reference both traded
+        x_joint, reference = np.where(joint, x, 0.0), np.where(joint, x[:, :1], 0.0)
+        n, sum_x, sum_xx = (RollingRisk.window_sum(values, self.window)[skip:] for values in (valid.astype(float), x, x * x))
+        n_joint, sum_a, sum_b, sum_aa, sum_bb, sum_ab = (RollingRisk.window_sum(values, self.window)[skip:]
+                                                         for values in (joint.astype(float), x_joint, reference, x_joint * x_joint,
+                                                                        reference * reference, x_joint * reference))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = np.maximum(sum_xx - sum_x ** 2 / n, 0) / (n - 1)
+            volatility = np.sqrt(variance * self.periods_per_year)
+            sharpe = (sum_x / n * self.periods_per_year - self.risk_free_rates) / volatility
+            covariance = sum_ab - sum_a * sum_b / n_joint
+            correlation = np.clip(covariance / np.sqrt(np.maximum(sum_aa - sum_a ** 2 / n_joint, 0) * np.maximum(sum_bb - sum_b ** 2 / n_joint, 0)), -1, 1)
+        volatility[n < self.min_periods] = np.nan
+        sharpe[n < self.min_periods] = np.nan
+        correlation[n_joint < self.min_periods] = np.nan
+
+        price_history = self._carry(self._prices, filled)
+        drawdown = filled / RollingRisk.window_max(price_history, self.window)[len(price_history) - len(filled):] - 1
+        max_drawdown = RollingRisk.window_max_drawdown(price_history, self.window)[len(price_history) - len(filled):]
+
+        self._returns, self._prices = self._keep(history), self._keep(price_history)
+        return RollingStats(volatility=volatility, sharpe=sharpe, correlation=correlation, drawdown=drawdown, max_drawdown=max_drawdown)
+
+    @staticmethod
+    def compute(prices, window, risk_free_rates=0.0, periods_per_year=None):
+        """ Method to compute the rolling metrics of a whole (T, N) price history in one pass """
+        return RollingRisk(window, risk_free_rates, periods_per_year=periods_per_year).extend(prices)
@@ -0,0 +1,99 @@
+# streaming.py
+import numpy as np
+from market_data.asset_frame import AssetFrame
+from market_data.fx_service import FXService
+from analytics.engine import AnalyticsEngine, ComparisonResult
+from analytics.rolling import RollingRisk
+from analytics.downsample import Downsampler
+
+class StreamingMetrics:
+    """ Comparison metrics accumulated block by block (e.g. intraday provider windows) & chart bars resampled in the same pass.
+        Memory is bounded by the N x N moments & the chart resolution, not by the length of the history. """
+    def __init__(self, tickers, price_type, start, end, target_points=None):
+        assets = len(tickers)
+        self.tickers = list(tickers)
+        self.price_type = price_type
+        span = int((np.datetime64(end, "s") - np.datetime64(start, "s")).astype(int))
+        self.bucket = max(-(-span // (target_points or Downsampler.target_points)), 1) # seconds per chart bar
+        self.last_price = np.full(assets, np.nan)  # last known price, carries returns over block boundaries
+        self.first_price = np.full(assets, np.nan)
+        self.log_growth = np.zeros(assets)
+        self.dividends = np.zeros(assets)
+        self.moments = tuple(np.zeros((assets, assets)) for _ in range(4)) # see AnalyticsEngine.co_moments
+        self.bars = np.empty(0, dtype=np.int64)     # chart bar ids (bucket start // bucket)
+        self.bar_prices = np.empty((0, assets))     # last price per chart bar, NaN if the asset did not trade in it
+        self.bar_volumes = np.empty((0, assets))    # traded units per chart bar
+        self.bar_fx = np.empty((0, assets))         # rate into the base currency at the end of the chart bar
+
+    def _resample(self, dates, prices, filled, volumes, fx_rates):
+        """ Method to reduce a block to chart bars & merge the bar it shares with the previous block """
+        ids = dates.astype("datetime64[s]").astype(np.int64) // self.bucket
+        starts = np.r_[0, np.nonzero(np.diff(ids))[0] + 1]
+        ends = np.r_[starts[1:], len(ids)] - 1
+        traded = np.add.reduceat((~np.isnan(prices)).astype(int), starts, axis=0) > 0
+        bar_prices = np.where(traded, filled[ends], np.nan)
+        bar_volumes = np.add.reduceat(np.nan_to_num(volumes), starts, axis=0)
+        bar_fx = np.asarray(fx_rates)[ends]
+        bars = ids[starts]
+        if len(self.bars) and self.bars[-1] == bars[0]:
+            self.bar_prices[-1] = np.where(traded[0], bar_prices[0], self.bar_prices[-1])
+            self.bar_volumes[-1] += bar_volumes[0]
+            self.bar_fx[-1] = bar_fx[0]
+            bars, bar_prices, bar_volumes, bar_fx = bars[1:], bar_prices[1:], bar_volumes[1:], bar_fx[1:]
+        self.bars = np.concatenate([self.bars, bars])
+        self.bar_prices = np.vstack([self.bar_prices, bar_prices])
+        self.bar_volumes = np.vstack([self.bar_volumes, bar_volumes])
+        self.bar_fx = np.vstack([self.bar_fx, bar_fx])
+
+    def update(self, frame, fx_rates):
+        """ Method to add a block (AssetFrame) & its (T, N) fx rates into the base currency """
+        if len(frame.dates) == 0:
+            return
+        prices = frame.column(self.price_type)
+        filled = RollingRisk.forward_fill(prices, self.last_price)
+        returns = prices / np.vstack([self.last_price[None, :], filled[:-1]]) - 1
+        new = np.isnan(self.first_price)
+        self.first_price[new] = prices[np.argmax(~np.isnan(prices), axis=0), np.arange(prices.shape[1])][new]
+        self.last_price = filled[-1]
+        self.log_growth += np.nansum(np.log1p(returns), axis=0)
+        if "Dividends" in frame.fields:
+            self.dividends += np.nansum(frame.column("Dividends"), axis=0)
+        self.moments = tuple(total + block for total, block in zip(self.moments, AnalyticsEngine.co_moments(returns)))
+        self._resample(frame.dates, prices, filled, frame.column("Volume"), fx_rates)
+
+    def result(self, currencies, infos, risk_free_rates):
+        """ Method to return the metrics as a ComparisonResult, prices, returns & volumes are the chart bars """
+        n, sum_x, sum_xx, _ = (np.diag(moment) for moment in self.moments)
+        rates = np.array([np.nan if rate is None else rate for rate in risk_free_rates], dtype=float)
+        dates = (self.bars * self.bucket).astype("datetime64[s]")
+        frame = AssetFrame(self.tickers, currencies, dates, np.stack([self.bar_prices, self.bar_volumes]), [self.price_type, "Volume"])
+        years = len(self.bars) and (self.bars[-1] - self.bars[0] + 1) * self.bucket / (365.25 * 24 * 60 * 60)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            geo_return = np.expm1(self.log_growth)
+            volatility = np.sqrt(np.maximum(sum_xx - sum_x ** 2 / n, 0) / (n - 1)) * np.sqrt(n)
+            return ComparisonResult(frame=frame,
+                                    price_type=self.price_type,
+                                    names=[infos[ticker]["shortName"] for ticker in self.tickers],
+                                    base_currency=currencies[0],
+                                    returns=AnalyticsEngine.simple_returns(self.bar_prices),
+                                    observations=n.astype(int),
+                                    geo_return=geo_return,
+                                    volatility=volatility,
+                                    dividend_yield=self.dividends / self.first_price,
+                                    pe=np.array([infos[ticker]["trailingPE"] for ticker in self.tickers], dtype=float),
+                                    sharpe=(geo_return - rates) / volatility,
+                                    correlation=AnalyticsEngine.correlation_from(self.moments),
+                                    fx_rates=self.bar_fx,
+                                    periods_per_year=(~np.isnan(self.bar_prices)).sum(axis=0) / years) # chart bars traded per year & asset
+
+    @staticmethod
+    def compute(blocks, tickers, infos, price_type, risk_free_rates, start, end, fx_histories=None, fx_service=None):
+        """ Method to consume the blocks of AssetFetcher.stream, prices are converted into the currency of the first asset
+            at the daily rate of each bar """
+        currencies = [infos[ticker]["currency"] for ticker in tickers]
+        fx_service = fx_service or FXService()
+        metrics = StreamingMetrics(tickers, price_type, start, end)
+        for frame in blocks:
+            metrics.update(frame, fx_service.conversion_matrix(frame.dates.astype("datetime64[D]"), currencies, currencies[0],
+                                                               fx_histories or {}, price_type))
+        return metrics.result(currencies, infos, risk_free_rates)
@@ -2,26 +2,34 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import os
 import time
 from datetime import date, timedelta
-import json
 from utils.utils import ExitButton
+from market_data.fetcher import AssetFetcher
+from market_data.metadata_store import MetadataStore
+from market_data.universe import TickerUniverse
+from analytics.engine import AnalyticsEngine
+from analytics.streaming import StreamingMetrics
+from analytics.rolling import RollingRisk
+from analytics.downsample import Downsampler
+from utils.cache import ResultCache
+from utils.instrumentation import Instrumentation
 
 class AssetComparison:
-    ticker_path="/Users/hb/Desktop/portfolio_tracker/ticker_names/ticker_names.json"
-    with open(ticker_path, "r", encoding="utf-8") as f:
-        ticker_names=json.load(f)
-
     today = date.today()
     one_year_ago = today - timedelta(days=365)
     select_price=["Open", "Close", "High", "Low"] # Close Adj missing
+    select_interval=["1d", "1h", "5m", "1m"] # intraday bars are streamed window by window, see AssetFetcher.stream
+    fetcher=AssetFetcher() # concurrent downloads, history served from the on-disk price store
+    live_ttl=10*60          # seconds a result is reused if the window reaches today (prices still moving)
+    end_of_day_ttl=12*60*60 # seconds a result is reused if the window only holds closed days
 
     def __init__(self):
             self.start_date = AssetComparison.one_year_ago
             self.end_date = AssetComparison.today
             self.price_type = AssetComparison.select_price[0]
+            self.interval = AssetComparison.select_interval[0]
             self.ticker_input_1 = None 
             self.ticker_input_2 = None
             self.risk_free_rate_1 = None
@@ -30,24 +38,45 @@ class AssetComparison:
             self.plot_metrics=None
 
     def format_label(self,ticker):
-        """ Method to assign tickers """
-        return f"{ticker} ({AssetComparison.ticker_names.get(ticker, 'Unknown')})"
+        """ Method to assign tickers, with currency & P/E if already in the metadata store (no download) """
+        label = f"{ticker} ({TickerUniverse.shared().name(ticker)})"
+        metadata = MetadataStore.shared().peek(ticker)
+        if metadata is None:
+            return label
+        pe = "" if np.isnan(metadata["trailingPE"]) else f" · P/E {metadata['trailingPE']:.1f}"
+        return f"{label} · {metadata['currency']}{pe}"
+
+    def result_ttl(self):
+        """ Method to return the seconds cached results of the current parameters are reused """
+        return AssetComparison.live_ttl if self.end_date >= date.today() else AssetComparison.end_of_day_ttl
 
     def open_dialog(self):
         """Display pop up for user to add/change values to/in db """
         @st.dialog("Parameters",width="small")
         def pop_up_form():
             """ Dialog method to create the form for user input """
+            # outside the form, so the options follow the search while typing (a form only reruns on submit)
+            search_1 = st.text_input("Search asset 1", placeholder="Ticker or name", help="Prefix or fuzzy search over ticker & name")
+            search_2 = st.text_input("Search asset 2", placeholder="Ticker or name", help="Prefix or fuzzy search over ticker & name")
+            options_1 = TickerUniverse.shared().search(search_1)
+            options_2 = TickerUniverse.shared().search(search_2)
+            for search, options in ((search_1, options_1), (search_2, options_2)):
+                if not options: # never an empty selector, it would return None
+                    st.caption(f'No asset matches "{search}", showing the default list')
+                    options += TickerUniverse.shared().default()
+            if not search_2 and TickerUniverse.shared().last() not in options_2: # asset 2 defaults to the last ticker, as before the search
+                options_2.append(TickerUniverse.shared().last())
+
             with st.form("parameter_input"):
                 ticker_input_1 = st.selectbox("Asset 1", 
-                                            list(AssetComparison.ticker_names.keys()), 
+                                            options_1, 
                                             index=0, 
                                             help="Insert ticker of first security",
                                             format_func=self.format_label)
                 
                 ticker_input_2 = st.selectbox("Asset 2",
-                                            list(AssetComparison.ticker_names.keys()),
-                                            index=len(AssetComparison.ticker_names)-1,
+                                            options_2,
+                                            index=0 if search_2 else len(options_2)-1,
                                             help="Insert ticker of second security", 
                                             format_func=self.format_label)
                 
@@ -62,6 +91,11 @@ class AssetComparison:
                 price_type = st.selectbox("Price type",
                                         options=AssetComparison.select_price,
                                         help="Select price type. Only Adj Close corrects for dividends & stock splits")
+
+                interval = st.selectbox("Interval",
+                                        options=AssetComparison.select_interval,
+                                        help="Select bar interval. Intraday bars (times in UTC) include the end date & only reach back "
+                                             + ", ".join(f"{key}: {value.days} days" for key, value in AssetComparison.fetcher.provider.intraday_lookback.items()))
                 
                 risk_free_rate_1 = st.number_input("Risk free rate (asset 1)",
                                                 value=0.0,
@@ -85,6 +119,7 @@ class AssetComparison:
                                                         "start_date" : start_date,
                                                         "end_date" : end_date,
                                                         "price_type" : price_type,
+                                                        "interval" : interval,
                                                         "risk_free_rate_1" : risk_free_rate_1,
                                                         "risk_free_rate_2" : risk_free_rate_2}
                     st.session_state["run_analysis"]=True 
@@ -92,70 +127,31 @@ class AssetComparison:
         pop_up_form()
         
     def calculate_metrics(self):
+        """ Method to download all data & compute the metrics of the selected assets in one batched pass """
         tickers = [self.ticker_input_1, self.ticker_input_2]
         risk_free_rates=[self.risk_free_rate_1,self.risk_free_rate_2]
-        results_1 = []
-        results_2 = []
-
-        for i in range(len(tickers)):
-            ticker_object = yf.Ticker(tickers[i])
-            name = ticker_object.info.get('shortName', tickers[i])
-            ccy = ticker_object.info.get('currency', '')
-            asset_all = ticker_object.history(start=self.start_date, end=self.end_date, auto_adjust=False).reset_index()
-            asset_all['Date'] = asset_all['Date'].dt.date
-            asset = asset_all[["Date", self.price_type]].copy()
-            asset["Ccy"] = ccy
-            asset["Asset"] = tickers[i]
-
-            returns = asset[self.price_type].pct_change().dropna()
-            geo_mean_return = (np.prod(1 + returns)) - 1
-            stddev_return = returns.std() * np.sqrt(len(returns))
-            dividend = ticker_object.dividends.loc[pd.Timestamp(self.start_date).tz_localize('UTC'):
-                                                pd.Timestamp(self.end_date).tz_localize('UTC')]
-            dividend_yield = dividend.sum() / asset[self.price_type].iloc[0]
-            pe = ticker_object.info.get('trailingPE', np.nan)
-            risk_free_rate = risk_free_rates[i]
-
-            if risk_free_rate is None:
-                sharpe_ratio=np.nan
-            else:
-                sharpe_ratio = (geo_mean_return - risk_free_rate) / stddev_return    
-
-            metric_list = [ticker_object, name, ccy, asset, returns, geo_mean_return,stddev_return, dividend, dividend_yield, pe, sharpe_ratio, asset_all]
-
-            if i == 0:
-                results_1 = metric_list
-            else:
-                results_2 = metric_list
-
-        ticker_1, name_1, ccy_1, asset_1, return_1, geo_mean_return_1, stddev_return_1, dividend_1, dividend_yield_1, pe_1, sharpe_ratio_1, asset_all_1 = results_1
-        ticker_2, name_2, ccy_2, asset_2, return_2, geo_mean_return_2, stddev_return_2, dividend_2, dividend_yield_2, pe_2, sharpe_ratio_2,asset_all_2 = results_2
-
-        # correlation
-        correlation = return_1.corr(return_2)
-
-        if ccy_1 != ccy_2: # currencies dont match -> run fx conversion
-            fx_ticker = f"{ccy_2}{ccy_1}=X"
-            fx_rate = yf.Ticker(fx_ticker).history(start=self.start_date, end=self.end_date).reset_index()
-            fx_rate['Date'] = fx_rate['Date'].dt.date
-            asset_2 = asset_2.merge(fx_rate[['Date', self.price_type]], on="Date", how="left")
-            asset_2.columns = [asset_2.columns[0], self.price_type, asset_2.columns[2], asset_2.columns[3], fx_ticker]
-            asset_2[f"{self.price_type}_{ccy_1}"] = asset_2[self.price_type] * asset_2[fx_ticker]
-            assets = pd.DataFrame({f"{self.ticker_names[self.ticker_input_1]}": asset_1[self.price_type], 
-                                   f"{self.ticker_names[self.ticker_input_2]}": asset_2[f"{self.price_type}_{ccy_1}"], "Date": asset_1["Date"]})
-        else: # currencies match -> no fx conversion needed
-            fx_ticker=None
-            fx_rate=1
-            assets = pd.DataFrame({f"{self.ticker_names[self.ticker_input_1]}": asset_1[self.price_type], 
-                                   f"{self.ticker_names[self.ticker_input_2]}": asset_2[self.price_type], "Date": asset_1["Date"]})
-
-        return ticker_1, name_1, ccy_1, asset_1, return_1, geo_mean_return_1, stddev_return_1, dividend_1, dividend_yield_1, pe_1, asset_all_1,\
-               ticker_2, name_2, ccy_2, asset_2, return_2, geo_mean_return_2, stddev_return_2, dividend_2, dividend_yield_2, pe_2, asset_all_2,\
-               correlation, sharpe_ratio_1, sharpe_ratio_2, fx_ticker, fx_rate, assets    
+        end_date = self.end_date if self.interval == "1d" else self.end_date + timedelta(days=1) # intraday: incl. the (running) end date
+        with Instrumentation.stage("fetch"):
+            fetched = AssetComparison.fetcher.fetch(tickers, self.start_date, end_date, self.interval, fields=[self.price_type, "Volume", "Dividends"])
+        if fetched.blocks is not None:
+            with Instrumentation.stage("stream"): # downloads window by window & accumulates, the full history is never held
+                return StreamingMetrics.compute(fetched.blocks, tickers, fetched.infos, self.price_type, risk_free_rates,
+                                                max(self.start_date, AssetComparison.fetcher.provider.earliest(self.interval)), end_date,
+                                                fetched.fx, AssetComparison.fetcher.fx_service)
+        with Instrumentation.stage("metrics"):
+            return AnalyticsEngine.compute(fetched.frame, fetched.infos, self.price_type, risk_free_rates,
+                                           fetched.fx, AssetComparison.fetcher.fx_service)
 
     def plot_charts_metrics(self):
         """ Method to place the calculated metrics into the page """
-        st.text(f'Period ┃ {self.start_date.strftime("%d/%m/%Y")} - {self.end_date.strftime("%d/%m/%Y")}')
+        result = self.metrics
+        st.text(f'Period ┃ {self.start_date.strftime("%d/%m/%Y")} - {self.end_date.strftime("%d/%m/%Y")} ┃ {self.interval} bars')
+        earliest = AssetComparison.fetcher.provider.earliest(self.interval)
+        if earliest is not None and self.start_date < earliest:
+            st.caption(f"{self.interval} bars are only available from {earliest.strftime('%d/%m/%Y')}")
+        if len(result.dates) == 0:
+            st.warning("No bars in the selected period")
+            return
 
         html_template = """<div style="width:100%; height:100px; text-align:center; display:flex; 
                                    flex-direction:column; align-items:center; justify-content:center; 
@@ -163,66 +159,48 @@ class AssetComparison:
                             <div style="font-size: 11px; margin-bottom: 3px;">{label}</div>
                             <div>{value}</div>
                         </div>"""
-        
-        col1, col2, col3, col4, col5, col6, col7,col8 = st.columns(8)   
-# TO DO: For loop schreiben um das zu vereinfachen 
-        with col1:
-            st.markdown(html_template.format(label="Asset",value=AssetComparison.ticker_names[self.ticker_input_1], color="white"), unsafe_allow_html=True)
-        with col2:
-            st.markdown(html_template.format(label="Business days (period)", value=len(self.return_1), color="white"), unsafe_allow_html=True)
-        with col3:
-            st.markdown(html_template.format(label="Return (period)", value=f"{self.geo_mean_return_1 * 100:.2f} %", color="#107A00"), unsafe_allow_html=True)
-        with col4:
-            st.markdown(html_template.format(label="Risk (period)", value=f"{self.stddev_return_1 * 100:.2f} %", color="#E10000"), unsafe_allow_html=True)
-        with col5:
-            st.markdown(html_template.format(label="Dividend yield (period)", value=f"{self.dividend_yield_1 * 100:.2f} %", color="white"), unsafe_allow_html=True) 
-        with col6:
-            st.markdown(html_template.format(label="P/E ratio (latest)", value=f"{self.pe_1:.2f}", color="white"), unsafe_allow_html=True)
-        with col7:
-            st.markdown(html_template.format(label="Sharpe ratio (period)", value=f"{self.sharpe_ratio_1:.2f}" , color="white"), unsafe_allow_html=True)
-        with col8:        
-            st.markdown(html_template.format(label="Correlation (period)", value=f"{self.correlation:.2f}", color="white"), unsafe_allow_html=True)
 
-        col8, col9, col10, col11, col12, col13, col14, col15 = st.columns(8)
-        with col8:
-            st.markdown(html_template.format(label="", value=AssetComparison.ticker_names[self.ticker_input_2], color="white"), unsafe_allow_html=True)
-        with col9:
-            st.markdown(html_template.format(label="", value=len(self.return_2), color="white"), unsafe_allow_html=True)
-        with col10:
-            st.markdown(html_template.format(label="", value=f"{self.geo_mean_return_2 * 100:.2f} %", color="#107A00"), unsafe_allow_html=True)
-        with col11:
-            st.markdown(html_template.format(label="", value=f"{self.stddev_return_2 * 100:.2f} %", color="#E10000"), unsafe_allow_html=True)
-        with col12:
-            st.markdown(html_template.format(label="", value=f"{self.dividend_yield_2 * 100:.2f} %", color="white"), unsafe_allow_html=True)
-        with col13:
-            st.markdown(html_template.format(label="", value=f"{self.pe_2:.2f}", color="white"), unsafe_allow_html=True)
-        with col14:
-            st.markdown(html_template.format(label="", value=f"{self.sharpe_ratio_2:.2f}", color="white"), unsafe_allow_html=True)
-        with col15:
-            st.markdown(html_template.format(label="", value=f"{self.correlation:.2f}", color="white"), unsafe_allow_html=True)
-      
-        # used only for charts !
-        traded_volume = pd.DataFrame({f"{self.ticker_names[self.ticker_input_1]}": self.asset_all_1["Volume"],
-                                    f"{self.ticker_names[self.ticker_input_2]}": self.asset_all_2["Volume"],
-                                    "Date": self.asset_all_1["Date"]})
-        # used only for charts !
-        returns = pd.DataFrame({f"{self.ticker_names[self.ticker_input_1]}": self.return_1 * 100,
-                                f"{self.ticker_names[self.ticker_input_2]}": self.return_2 * 100,
-                                "Date": self.asset_1["Date"][1:]}) 
+        labels = [TickerUniverse.shared().name(ticker, ticker) for ticker in result.tickers]
+        correlation = result.correlation.copy()
+        np.fill_diagonal(correlation, np.nan)
+        with np.errstate(invalid="ignore"):
+            mean_correlation = np.nanmean(correlation, axis=1) if len(labels) > 1 else np.full(len(labels), np.nan) # with 2 assets: their correlation
+
+        tiles = [("Asset", labels, "white"),
+                 ("Business days (period)" if self.interval == "1d" else f"{self.interval} bars (period)", result.observations, "white"),
+                 ("Return (period)", [f"{value * 100:.2f} %" for value in result.geo_return], "#107A00"),
+                 ("Risk (period)", [f"{value * 100:.2f} %" for value in result.volatility], "#E10000"),
+                 ("Dividend yield (period)", [f"{value * 100:.2f} %" for value in result.dividend_yield], "white"),
+                 ("P/E ratio (latest)", [f"{value:.2f}" for value in result.pe], "white"),
+                 ("Sharpe ratio (period)", [f"{value:.2f}" for value in result.sharpe], "white"),
+                 ("Correlation (period)", [f"{value:.2f}" for value in mean_correlation], "white")]
+
+        for i in range(len(labels)): # one row per asset, labels only on the first row
+            for column, (label, values, color) in zip(st.columns(len(tiles)), tiles):
+                with column:
+                    st.markdown(html_template.format(label=label if i == 0 else "", value=values[i], color=color), unsafe_allow_html=True)
+
+        # used only for charts ! downsampled to the chart width, full resolution once zoomed in far enough
+        dates = result.axis()
+        zoom_start, zoom_end = st.slider("Zoom", min_value=dates[0], max_value=dates[-1], value=(dates[0], dates[-1])) if len(dates) > 1 else (None, None)
+        with Instrumentation.stage("chart_prep"):
+            assets = Downsampler.frame(result.chart_frame(result.prices_base, labels).ffill(), "lttb", start=zoom_start, end=zoom_end)
+            returns = Downsampler.frame(result.chart_frame(result.returns * 100, labels), "min_max", start=zoom_start, end=zoom_end)
+            traded_volume = Downsampler.frame(result.chart_frame(result.volumes, labels), "min_max", start=zoom_start, end=zoom_end)
 
         # charts - asset & return trajectory
         col_chart1, col_chart2 = st.columns(2)
         with col_chart1:
-            st.markdown(f'<div style="text-align: center; font-weight: bold; font-size: 20px;">Prices ({self.ccy_1})</div>', unsafe_allow_html=True)
-            st.line_chart(self.assets.round(2), x="Date")
+            st.markdown(f'<div style="text-align: center; font-weight: bold; font-size: 20px;">Prices ({result.base_currency})</div>', unsafe_allow_html=True)
+            st.line_chart(assets.round(2), x="Date")
         with col_chart2:
             st.markdown('<div style="text-align: center; font-weight: bold; font-size: 20px;">Returns (%)</div>', unsafe_allow_html=True)
             st.line_chart(returns.round(4), x="Date")
 
         # charts - risk/return bar chart
-        bar_df = pd.DataFrame({"Risk": [self.stddev_return_1 * 100, self.stddev_return_2 * 100],
-                            "Return": [self.geo_mean_return_1 * 100, self.geo_mean_return_2 * 100]}, 
-                            index=[self.ticker_names[self.ticker_input_1], self.ticker_names[self.ticker_input_2]])
+        bar_df = pd.DataFrame({"Risk": result.volatility * 100,
+                               "Return": result.geo_return * 100},
+                              index=labels)
 
         col_bar1, col_bar2 = st.columns(2)
         with col_bar1:
@@ -232,6 +210,34 @@ class AssetComparison:
             st.markdown('<div style="text-align: center; font-weight: bold; font-size: 20px;">Risk VS Return (%)</div>', unsafe_allow_html=True)
             st.bar_chart(bar_df, color=["#E10000", "#107A00"], stack=False, horizontal=False, use_container_width=True)
 
+        # charts - rolling risk (local ccy, correlation against the first asset)
+        window = st.selectbox("Rolling window (days traded by any asset)" if self.interval == "1d" else "Rolling window (chart bars)", RollingRisk.windows, index=1, key="rolling_window")
+        with Instrumentation.stage("rolling"): # zoom & window changes rerun the page, each window is computed once per result
+            rolling = ResultCache.shared().get_or_compute(("rolling", window) + tuple(st.session_state["user_input"].items()),
+                                                          lambda: RollingRisk.compute(result.prices, window, [self.risk_free_rate_1, self.risk_free_rate_2], result.periods_per_year),
+                                                          ttl=self.result_ttl(),
+                                                          sizeof=lambda stats: stats.nbytes)
+
+        col_roll1, col_roll2, col_roll3 = st.columns(3)
+        with col_roll1:
+            st.markdown('<div style="text-align: center; font-weight: bold; font-size: 20px;">Rolling risk (% p.a.)</div>', unsafe_allow_html=True)
+            st.line_chart(Downsampler.frame(result.chart_frame(rolling.volatility * 100, labels), "lttb", start=zoom_start, end=zoom_end).round(2), x="Date")
+        with col_roll2:
+            st.markdown(f'<div style="text-align: center; font-weight: bold; font-size: 20px;">Rolling correlation (vs. {labels[0]})</div>', unsafe_allow_html=True)
+            st.line_chart(Downsampler.frame(result.chart_frame(rolling.correlation[:, 1:], labels[1:]), "lttb", start=zoom_start, end=zoom_end).round(2), x="Date")
+        with col_roll3:
+            st.markdown('<div style="text-align: center; font-weight: bold; font-size: 20px;">Rolling max drawdown (%)</div>', unsafe_allow_html=True)
+            st.line_chart(Downsampler.frame(result.chart_frame(rolling.max_drawdown * 100, labels), "min_max", start=zoom_start, end=zoom_end).round(2), x="Date")
+
+    def performance_panel(self):
+        """ Method to show the stage breakdown of the current run, only if instrumentation is enabled (PT_INSTRUMENTATION=1) """
+        run = Instrumentation.current()
+        if run is None:
+            return
+        with st.expander("Performance", expanded=False):
+            st.dataframe(run.table(), hide_index=True, use_container_width=True)
+            st.json(run.record()["counters"])
+
     def page_layout(self):
         """ Defines the base layout of page & orchestartes the flow """
          
@@ -245,6 +251,8 @@ class AssetComparison:
         with col3:
             ExitButton.exit_button()
 
+        MetadataStore.shared().prefetch_in_background(TickerUniverse.shared().default()) # daily, labels show ccy & P/E once loaded
+
         if analyse: # button to open dialog
             self.open_dialog()
 
@@ -254,45 +262,19 @@ class AssetComparison:
             self.start_date=st.session_state["user_input"]["start_date"]
             self.end_date=st.session_state["user_input"]["end_date"]
             self.price_type=st.session_state["user_input"]["price_type"]
+            self.interval=st.session_state["user_input"].get("interval", "1d")
             self.risk_free_rate_1=st.session_state["user_input"]["risk_free_rate_1"]
             self.risk_free_rate_2=st.session_state["user_input"]["risk_free_rate_2"]
 
-            ticker_1, name_1, ccy_1, asset_1, return_1, geo_mean_return_1, stddev_return_1, dividend_1, dividend_yield_1, pe_1, asset_all_1, \
-            ticker_2, name_2, ccy_2, asset_2, return_2, geo_mean_return_2, stddev_return_2, dividend_2, dividend_yield_2, pe_2, asset_all_2, \
-            correlation, sharpe_ratio_1, sharpe_ratio_2, fx_ticker, fx_rate, assets = self.calculate_metrics()
-
-            self.return_1 = return_1
-            self.ticker_1=ticker_1
-            self.name_1=name_1
-            self.ccy_1=ccy_1
-            self.geo_mean_return_1 = geo_mean_return_1
-            self.stddev_return_1 = stddev_return_1
-            self.dividend_1 = dividend_1
-            self.dividend_yield_1 = dividend_yield_1
-            self.pe_1 = pe_1
-            self.asset_all_1=asset_all_1
-            self.sharpe_ratio_1 = sharpe_ratio_1
-            self.asset_1=asset_1
-
-            self.return_2 = return_2
-            self.ticker_2=ticker_2
-            self.name_2=name_2
-            self.ccy_2=ccy_2
-            self.geo_mean_return_2 = geo_mean_return_2
-            self.stddev_return_2 = stddev_return_2
-            self.dividend_2 = dividend_2
-            self.dividend_yield_2 = dividend_yield_2
-            self.pe_2 = pe_2
-            self.asset_all_2=asset_all_2
-            self.asset_2=asset_2            
-            self.sharpe_ratio_2 = sharpe_ratio_2
-
-            self.correlation = correlation
-            self.fx_ticker = fx_ticker
-            self.fx_rate = fx_rate
-            self.assets = assets
-            
-            self.plot_charts_metrics()
+            with Instrumentation.run("asset_comparison"):
+                # reruns with unchanged parameters (same or other session) are served from the shared cache
+                self.metrics = ResultCache.shared().get_or_compute(("asset_comparison",) + tuple(st.session_state["user_input"].items()),
+                                                                   self.calculate_metrics,
+                                                                   ttl=self.result_ttl(),
+                                                                   sizeof=lambda result: result.nbytes)
+                with Instrumentation.stage("charts"):
+                    self.plot_charts_metrics()
+                self.performance_panel()
 
 if __name__=="__main__": # Needed since we use the st.navigation() so every page must be run as a script
     asset_comparison=AssetComparison()
@@ -0,0 +1,120 @@
+# benchmark.py
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+import pandas as pd
+from market_data.providers import SyntheticProvider, FixtureProvider
+from market_data.price_store import PriceStore
+from market_data.metadata_store import MetadataStore
+from market_data.fx_service import FXService
+from market_data.fetcher import AssetFetcher
+from analytics.engine import AnalyticsEngine
+from analytics.streaming import StreamingMetrics
+from analytics.downsample import Downsampler
+
+class Benchmark:
+    """ Headless benchmark of the comparison pipeline (fetch, metrics, fx, chart prep) on an offline provider """
+    suffixes = ["", ".DE", ".T", ".PA", ".SW", "-USD"] # mix of calendars & currencies
+
+    def __init__(self, provider=None, price_type="Close"):
+        self.provider = provider or SyntheticProvider()
+        self.price_type = price_type
+
+    @staticmethod
+    def universe(assets):
+        """ Method to return synthetic tickers spread over all suffixes """
+        return [f"SYN{i:04d}{Benchmark.suffixes[i % len(Benchmark.suffixes)]}" for i in range(assets)]
+
+    @staticmethod
+    def measure(function, *args):
+        """ Method to run a stage & return (result, seconds or peak MiB allocated during the stage if tracemalloc is on) """
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+            result = function(*args)
+            return result, (tracemalloc.get_traced_memory()[1] - start_memory) / 1024 ** 2
+        start = time.perf_counter()
+        result = function(*args)
+        return result, time.perf_counter() - start
+
+    def run_stages(self, tickers, start_date, end_date, interval):
+        """ Method to run all stages once on a cold on-disk cache, returning the measurement per stage """
+        measurements = {}
+        with tempfile.TemporaryDirectory() as directory:
+            price_store = PriceStore(os.path.join(directory, "prices"), self.provider)
+            fx_service = FXService(price_store)
+            fetcher = AssetFetcher(price_store, MetadataStore(os.path.join(directory, "metadata.json"), self.provider), fx_service, self.provider)
+
+            fields = [self.price_type, "Volume", "Dividends"] # what the page keeps
+            fetched, measurements["fetch"] = Benchmark.measure(fetcher.fetch, tickers, start_date, end_date, interval, fields)
+            _, measurements["fetch_warm"] = Benchmark.measure(fetcher.fetch, tickers, start_date, end_date, interval, fields)
+            if fetched.blocks is None:
+                result, measurements["metrics"] = Benchmark.measure(AnalyticsEngine.compute, fetched.frame, fetched.infos,
+                                                                    self.price_type, [0.0] * len(tickers), fetched.fx, fx_service)
+            else: # intraday: the windows are downloaded while the metrics consume them
+                result, measurements["metrics"] = Benchmark.measure(StreamingMetrics.compute, fetched.blocks, tickers, fetched.infos, self.price_type,
+                                                                    [0.0] * len(tickers), max(start_date, self.provider.earliest(interval)),
+                                                                    end_date, fetched.fx, fx_service)
+            _, measurements["fx"] = Benchmark.measure(fx_service.convert, result.prices, result.dates, result.currencies,
+                                                      result.base_currency, fetched.fx, self.price_type)
+            _, measurements["charts"] = Benchmark.measure(self.chart_prep, result)
+        return measurements, len(result.dates)
+
+    def run_case(self, assets, years, interval, memory=True):
+        """ Method to benchmark one comparison, latency & memory come from separate runs (tracemalloc slows everything down) """
+        tickers = Benchmark.universe(assets)
+        end_date = date.today()
+        start_date = end_date - timedelta(days=365 * years)
+        row = {"assets": assets, "years": years, "interval": interval}
+
+        latencies, row["bars"] = self.run_stages(tickers, start_date, end_date, interval)
+        row.update({f"{stage}_s": seconds for stage, seconds in latencies.items()})
+        if memory:
+            tracemalloc.start()
+            try:
+                peaks, _ = self.run_stages(tickers, start_date, end_date, interval)
+            finally:
+                tracemalloc.stop()
+            row.update({f"{stage}_mib": mib for stage, mib in peaks.items()})
+        return row
+
+    @staticmethod
+    def chart_prep(result):
+        """ Method to build & downsample the chart frames the way plot_charts_metrics does (fully zoomed out) """
+        return (Downsampler.frame(result.chart_frame(result.prices_base, result.tickers).ffill(), "lttb").round(2),
+                Downsampler.frame(result.chart_frame(result.returns * 100, result.tickers), "min_max").round(4),
+                Downsampler.frame(result.chart_frame(result.volumes, result.tickers), "min_max"))
+
+    def sweep(self, assets, years, intervals, memory=True):
+        """ Method to run every combination, yielding one result row per case """
+        for interval in intervals:
+            for history in years:
+                for count in assets:
+                    yield self.run_case(count, history, interval, memory)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the asset comparison pipeline offline")
+    parser.add_argument("--assets", type=int, nargs="+", default=[2, 10, 50, 100, 500], help="Number of assets per comparison")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 10, 30], help="History length in years")
+    parser.add_argument("--intervals", nargs="+", default=["1d"], help="Bar intervals (1d, 1wk, 1mo, or intraday 1h, 5m, 1m streamed within the provider limits)")
+    parser.add_argument("--fixtures", help="Directory with recorded responses (recorded from the synthetic provider if missing)")
+    parser.add_argument("--output", help="Append results as JSON lines to this file")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the (slow) peak memory run")
+    args = parser.parse_args()
+
+    provider = FixtureProvider(args.fixtures, SyntheticProvider()) if args.fixtures else SyntheticProvider()
+    rows = []
+    for row in Benchmark(provider).sweep(args.assets, args.years, args.intervals, not args.no_memory):
+        rows.append(row)
+        print(" ".join(f"{key}={value:.4f}" if isinstance(value, float) else f"{key}={value}" for key, value in row.items()), flush=True)
+        if args.output:
+            with open(args.output, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row) + "\n")
+    print(pd.DataFrame(rows).round(4).to_string(index=False))
+
+if __name__ == "__main__": # run from the package folder: python -m benchmark.benchmark
+    main()
@@ -3,6 +3,7 @@ import time
 from datetime import date, timedelta
 import os
 from asset_comparison.asset_comparison import AssetComparison
+from utils.instrumentation import Instrumentation
 
 class MainPage:
     version = "0.0.1"
@@ -59,7 +60,8 @@ class MainPage:
                 "Recommendation": [st.Page("recommendation/recommendation.py", title="Name missing")]}
 
         pg = st.navigation(pages, position="top")
-        pg.run()
+        with Instrumentation.run("page"): # one timed run per rerun, PT_INSTRUMENTATION=1
+            pg.run()
 
 if __name__=="__main__": # necessary to directly run the script!
     mainpage=MainPage()
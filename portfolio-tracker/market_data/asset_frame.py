@@ -0,0 +1,50 @@
+# asset_frame.py
+import numpy as np
+import pandas as pd
+
+class AssetFrame:
+    """ Compact columnar bars of N assets: one shared date index & one (T, N) block per field in a single contiguous array.
+        Ticker & currency are held once per asset, not repeated on every row. """
+    fields = ["Open", "High", "Low", "Close", "Adj Close", "Volume", "Dividends"]
+    dtype = np.float64 # float32 halves the memory, at ~7 significant digits
+
+    def __init__(self, tickers, currencies, dates, values, fields=None):
+        self.tickers = list(tickers)
+        self.currencies = list(currencies)
+        self.fields = list(fields or AssetFrame.fields)
+        self.dates = dates   # (T,) datetime64[D] (daily & coarser) or datetime64[s] in UTC (intraday), union of all bars
+        self.values = values # (F, T, N) ordered like self.fields, NaN where an asset did not trade
+        self.values.flags.writeable = False # columns are handed out as views & shared across sessions
+
+    @staticmethod
+    def to_dates(values, unit="D"):
+        """ Method to convert a sequence of dates into a datetime64[D] array, or tz aware timestamps into UTC datetime64[unit] """
+        if unit == "D":
+            return np.asarray(pd.to_datetime(pd.Series(values)).values, dtype="datetime64[D]")
+        return np.asarray(pd.to_datetime(pd.Series(values), utc=True).dt.tz_localize(None).values, dtype=f"datetime64[{unit}]")
+
+    @staticmethod
+    def from_histories(tickers, currencies, histories, fields=None, dtype=None, unit="D"):
+        """ Method to scatter per ticker bar frames (with a 'Date' column) into one frame on the union of their dates
+            fields: subset of AssetFrame.fields to keep (default all), unit: "D" for daily bars, e.g. "s" for intraday """
+        fields = list(fields or AssetFrame.fields)
+        dtype = dtype or AssetFrame.dtype
+        series = [AssetFrame.to_dates(histories[ticker]["Date"], unit) for ticker in tickers]
+        dates = np.unique(np.concatenate(series)) if series else np.array([], dtype=f"datetime64[{unit}]")
+        values = np.full((len(fields), len(dates), len(tickers)), np.nan, dtype=dtype)
+        for j, (ticker, series_dates) in enumerate(zip(tickers, series)):
+            values[:, np.searchsorted(dates, series_dates), j] = histories[ticker].reindex(columns=fields).to_numpy(dtype).T
+        return AssetFrame(tickers, currencies, dates, values, fields)
+
+    @property
+    def nbytes(self):
+        """ Memory held by the frame """
+        return self.values.nbytes + self.dates.nbytes
+
+    def column(self, field):
+        """ Method to return the (T, N) block of one field (e.g. the selected price type) as a read-only view, no copy """
+        return self.values[self.fields.index(field)]
+
+    def convert(self, field, fx_rates):
+        """ Method to convert the (T, N) block of a price field with (T, N) fx rates in one vectorized multiply """
+        return self.column(field) * fx_rates
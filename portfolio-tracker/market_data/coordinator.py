@@ -0,0 +1,83 @@
+# coordinator.py
+import threading
+import time
+from utils.instrumentation import Instrumentation
+
+class Flight:
+    """ One request in flight, the outcome is read by every caller that joined it """
+    def __init__(self):
+        self.done = threading.Event()
+        self.started = time.monotonic()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """ Process wide coordinator that runs identical requests in flight at the same time (same kind, ticker, date range & interval)
+        only once & hands the outcome to every caller. Nothing is kept after the flight lands, so a failure is retried by the next caller. """
+    retries = 2    # extra attempts of the leading call on errors, downloads are idempotent reads
+    backoff = 0.5  # seconds before the first retry, doubled per attempt
+    max_wait = 30  # seconds a flight is joined, a slower one is abandoned to finish on its own & the next caller starts afresh
+
+    _shared = None
+    _shared_guard = threading.Lock()
+
+    def __init__(self, retries=None, backoff=None, max_wait=None):
+        self.retries = SingleFlight.retries if retries is None else retries
+        self.backoff = SingleFlight.backoff if backoff is None else backoff
+        self.max_wait = max_wait or SingleFlight.max_wait
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.calls = 0     # requests that ran
+        self.coalesced = 0 # requests served by the flight of another caller
+
+    @classmethod
+    def shared(cls):
+        """ Method to return the coordinator shared by all sessions """
+        with cls._shared_guard:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _run(self, function, args):
+        """ Method to call function, retrying errors with exponential backoff """
+        for attempt in range(self.retries + 1):
+            try:
+                return function(*args)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def do(self, key, function, *args):
+        """ Method to return function(*args), joining an identical request already in flight instead of running it again
+            the result is shared between callers & must not be modified """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and time.monotonic() - flight.started > self.max_wait:
+                flight = None # hung, its late outcome only reaches the callers that already joined
+            leader = flight is None
+            if leader:
+                flight = Flight()
+                self._flights[key] = flight
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                flight.result = self._run(function, args)
+            except BaseException as error:
+                flight.error = error
+            finally:
+                with self._lock:
+                    if self._flights.get(key) is flight: # not replaced after being abandoned
+                        del self._flights[key]
+                flight.done.set()
+        else:
+            Instrumentation.count("coalesced")
+            if not flight.done.wait(max(flight.started + self.max_wait - time.monotonic(), 0)):
+                raise TimeoutError(f"Request {key} still in flight after {self.max_wait}s")
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
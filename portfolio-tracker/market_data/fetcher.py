@@ -0,0 +1,119 @@
+# fetcher.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import pandas as pd
+from market_data.providers import MarketDataProvider
+from market_data.price_store import PriceStore
+from market_data.metadata_store import MetadataStore
+from market_data.fx_service import FXService
+from market_data.asset_frame import AssetFrame
+from market_data.coordinator import SingleFlight
+from utils.instrumentation import Instrumentation
+
+@dataclass
+class FetchResult:
+    """ Everything downloaded for one comparison: bars of all tickers in one AssetFrame, infos keyed by ticker, fx base series keyed by currency """
+    frame: AssetFrame = None
+    infos: dict = field(default_factory=dict)
+    fx: dict = field(default_factory=dict)
+    blocks: object = None # intraday instead of frame: generator of one AssetFrame per provider window, see AssetFetcher.stream
+
+class AssetFetcher:
+    """ Plans every download of a comparison up front & runs them concurrently on a shared thread pool """
+    max_workers = 8  # process wide cap on concurrent provider requests
+    timeout = 30     # seconds per request once it runs, & again at most in the queue of the shared pool
+
+    _executor = None
+    _executor_guard = threading.Lock()
+
+    def __init__(self, price_store=None, metadata_store=None, fx_service=None, provider=None, timeout=None):
+        self.provider = provider or MarketDataProvider.default()
+        self.price_store = price_store or PriceStore(provider=self.provider)
+        self.metadata_store = metadata_store or MetadataStore.shared()
+        self.fx_service = fx_service or FXService(self.price_store)
+        self.timeout = timeout or AssetFetcher.timeout
+
+    @classmethod
+    def executor(cls):
+        """ Method to lazily create the thread pool shared by all sessions """
+        with cls._executor_guard:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.max_workers, thread_name_prefix="fetch")
+            return cls._executor
+
+    def _submit(self, requests, key, function, *args):
+        started = {"event": threading.Event(), "submitted": time.monotonic()}
+        def run(): # the timeout counts from the start of the request, not from the time it waited in the queue
+            started["at"] = time.monotonic()
+            started["event"].set()
+            with Instrumentation.stage(key[0]):
+                return function(*args)
+        requests[key] = (self.executor().submit(Instrumentation.bind(run)), started)
+
+    def _collect(self, requests, key):
+        """ Method to wait for a request, at most timeout seconds in the queue & timeout seconds once it runs """
+        future, started = requests[key]
+        if not started["event"].wait(max(started["submitted"] + self.timeout - time.monotonic(), 0)) and future.cancel():
+            raise TimeoutError(f"Request {key} still queued after {self.timeout}s, all {self.max_workers} workers busy")
+        started["event"].wait() # lost the race against cancel, it has just started
+        try:
+            return future.result(timeout=max(started["at"] + self.timeout - time.monotonic(), 0))
+        except TimeoutError:
+            # a running request cannot be cancelled, it finishes on its worker & its result is dropped
+            raise TimeoutError(f"Request {key} timed out after {self.timeout}s")
+
+    def fetch(self, tickers, start_date, end_date, interval="1d", fields=None):
+        """ Method to download prices (dividends are part of the bars), metadata & the fx base series of all currencies in parallel
+            fields: bar fields kept in the returned AssetFrame (default all) """
+        intraday = interval in self.provider.intraday_window
+        requests = {}
+        for ticker in tickers:
+            self._submit(requests, ("info", ticker), self.metadata_store.get, ticker) # no round trip if loaded today
+            if not intraday:
+                self._submit(requests, ("history", ticker), self.price_store.get_history, ticker, start_date, end_date, interval)
+
+        result = FetchResult()
+        for ticker in tickers: # fx series depend on the currencies, so they start as soon as all infos are in
+            result.infos[ticker] = self._collect(requests, ("info", ticker))
+        for ccy in FXService.base_currencies([info["currency"] for info in result.infos.values()]):
+            self._submit(requests, ("fx", ccy), self.fx_service.base_history, ccy, start_date, end_date)
+
+        histories = {}
+        targets = {"history": histories, "fx": result.fx}
+        for kind, key in requests:
+            if kind in targets:
+                targets[kind][key] = self._collect(requests, (kind, key))
+        currencies = [result.infos[ticker]["currency"] for ticker in tickers]
+        if intraday: # fx stays daily, intraday bars are converted at the rate of their day
+            result.blocks = self.stream(tickers, currencies, start_date, end_date, interval, fields)
+        else:
+            result.frame = AssetFrame.from_histories(tickers, currencies, histories, fields) # bar frames are dropped here
+        return result
+
+    def _download(self, ticker, start, end, interval):
+        """ Method to download one window of intraday bars, identical windows of concurrent sessions are downloaded once """
+        with Instrumentation.stage("download_history"):
+            bars = SingleFlight.shared().do(("history", self.provider, ticker, interval, start, end), self.provider.history, ticker, start, end, interval)
+        if Instrumentation.enabled:
+            Instrumentation.count("history_downloads")
+            Instrumentation.count("bytes_fetched", int(bars.memory_usage(index=True).sum()))
+        bars = bars.rename_axis("Date").reset_index()
+        bars["Date"] = pd.to_datetime(bars["Date"], utc=True).dt.floor(pd.to_timedelta(interval.replace("m", "min"))) # one grid for all exchanges
+        return bars
+
+    def stream(self, tickers, currencies, start_date, end_date, interval, fields=None):
+        """ Method to yield one AssetFrame (UTC timestamps) per provider window of [start_date, end_date), the tickers of a window are
+            downloaded in parallel & the next window while the caller processes the current one, so at most two are held """
+        chunks = self.provider.chunks(start_date, end_date, interval)
+        def submit(chunk):
+            requests = {}
+            for ticker in tickers:
+                self._submit(requests, ("history", ticker), self._download, ticker, *chunk, interval)
+            return requests
+        pending = submit(chunks[0]) if chunks else None
+        for i in range(len(chunks)):
+            requests, pending = pending, submit(chunks[i + 1]) if i + 1 < len(chunks) else None
+            histories = {ticker: self._collect(requests, ("history", ticker)) for ticker in tickers}
+            yield AssetFrame.from_histories(tickers, currencies, histories, fields, unit="s")
@@ -0,0 +1,65 @@
+# fx_service.py
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from market_data.price_store import PriceStore
+
+class FXService:
+    """ FX conversion from one cached base series per currency (units per USD), cross rates derived locally """
+    pivot = "USD"
+    minor_units = {"GBp": ("GBP", 0.01), "GBX": ("GBP", 0.01), "ILA": ("ILS", 0.01), "ZAc": ("ZAR", 0.01)} # quoted in cents/pence
+    max_staleness = 5 # calendar days an fx rate is carried forward over holidays that do not line up
+
+    def __init__(self, price_store=None, max_staleness=None):
+        self.price_store = price_store or PriceStore()
+        self.max_staleness = FXService.max_staleness if max_staleness is None else max_staleness
+
+    @staticmethod
+    def major(ccy):
+        """ Method to map a minor unit (e.g. GBp) to (major currency, factor into the major currency) """
+        return FXService.minor_units.get(ccy, (ccy, 1.0))
+
+    @staticmethod
+    def base_ticker(ccy):
+        """ Method to build the provider symbol quoting units of ccy per USD """
+        return f"{ccy}=X"
+
+    @staticmethod
+    def base_currencies(currencies):
+        """ Method to return the base series needed to convert between all given currencies """
+        majors = {FXService.major(ccy)[0] for ccy in currencies}
+        return [] if len(majors) < 2 else sorted(majors - {FXService.pivot})
+
+    def base_history(self, ccy, start_date, end_date):
+        """ Method to load the base series of a currency, starting early enough to carry a rate into start_date """
+        return self.price_store.get_history(FXService.base_ticker(ccy), start_date - timedelta(days=self.max_staleness), end_date)
+
+    def align(self, dates, history, price_type):
+        """ Method to pick the latest rate on or before each date, NaN if older than max_staleness days """
+        fx_dates = np.asarray(pd.to_datetime(pd.Series(history["Date"])).values, dtype="datetime64[D]")
+        values = history[price_type].to_numpy(float)
+        keep = ~np.isnan(values)
+        fx_dates, values = fx_dates[keep], values[keep]
+        if len(values) == 0:
+            return np.full(len(dates), np.nan)
+        rows = np.searchsorted(fx_dates, dates, side="right") - 1
+        fresh = (rows >= 0) & (dates - fx_dates[np.maximum(rows, 0)] <= np.timedelta64(self.max_staleness, "D"))
+        return np.where(fresh, values[np.maximum(rows, 0)], np.nan)
+
+    def conversion_matrix(self, dates, currencies, target, histories, price_type):
+        """ Method to build the (T, N) rates converting each asset's currency into target on the given dates
+            histories: base series by major currency (see base_currencies), the pivot needs none """
+        per_usd = {FXService.pivot: np.ones(len(dates))}
+        for ccy in {FXService.major(ccy)[0] for ccy in currencies + [target]} - {FXService.pivot}:
+            per_usd[ccy] = self.align(dates, histories[ccy], price_type) if ccy in histories else np.full(len(dates), np.nan)
+
+        target_major, target_factor = FXService.major(target)
+        majors, factors = zip(*(FXService.major(ccy) for ccy in currencies))
+        if all(major == target_major for major in majors):
+            return np.broadcast_to(np.array(factors) / target_factor, (len(dates), len(currencies)))
+        source = np.column_stack([per_usd[major] for major in majors])
+        return per_usd[target_major][:, None] / source * (np.array(factors) / target_factor)
+
+    def convert(self, prices, dates, currencies, target, histories, price_type):
+        """ Method to convert a (T, N) price matrix into target in one vectorized multiply """
+        return prices * self.conversion_matrix(dates, currencies, target, histories, price_type)
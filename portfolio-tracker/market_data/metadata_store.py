@@ -0,0 +1,115 @@
+# metadata_store.py
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import numpy as np
+from market_data.providers import MarketDataProvider
+from market_data.coordinator import SingleFlight
+from utils.instrumentation import Instrumentation
+
+class MetadataStore:
+    """ Daily on-disk cache of the .info fields used by the app (shortName, currency, trailingPE) """
+    store_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "metadata.json")
+    max_workers = 4 # .info is rate limited, keep bulk loads gentle
+
+    _shared = None
+    _shared_guard = threading.Lock()
+
+    def __init__(self, store_path=None, provider=None):
+        self.store_path = store_path or MetadataStore.store_path
+        self.provider = provider or MarketDataProvider.default()
+        self._entries = None # ticker -> {field: value, "fetched": iso date}, loaded lazily
+        self._lock = threading.Lock()
+        self._prefetched_on = None # date of the last background prefetch, at most one per day
+
+    @classmethod
+    def shared(cls):
+        """ Method to return the store shared by all sessions """
+        with cls._shared_guard:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def download(self, ticker):
+        """ Method to download the fields of one ticker in a single .info round trip """
+        info = self.provider.info(ticker)
+        return {"shortName": info.get("shortName", ticker),
+                "currency": info.get("currency", ""),
+                "trailingPE": info.get("trailingPE")}
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.store_path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+        temp_path = f"{self.store_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=1)
+        os.replace(temp_path, self.store_path)
+
+    @staticmethod
+    def _public(entry):
+        """ Method to strip the bookkeeping & map a missing P/E to NaN """
+        return {"shortName": entry["shortName"],
+                "currency": entry["currency"],
+                "trailingPE": np.nan if entry["trailingPE"] is None else entry["trailingPE"]}
+
+    def peek(self, ticker):
+        """ Method to return the cached fields (even if stale) without any download, None if unknown """
+        with self._lock:
+            entry = self._load().get(ticker)
+        return None if entry is None else MetadataStore._public(entry)
+
+    def stale(self, tickers):
+        """ Method to return the tickers without an entry from today """
+        today = date.today().isoformat()
+        with self._lock:
+            entries = self._load()
+            return [ticker for ticker in tickers if entries.get(ticker, {}).get("fetched") != today]
+
+    def prefetch(self, tickers, max_workers=None):
+        """ Method to download all stale tickers concurrently & persist them in one write, failures are skipped """
+        missing = self.stale(tickers)
+        if not missing:
+            return
+        with ThreadPoolExecutor(max_workers=max_workers or MetadataStore.max_workers) as executor:
+            futures = {ticker: executor.submit(self.download, ticker) for ticker in missing}
+        today = date.today().isoformat()
+        with self._lock:
+            entries = self._load()
+            for ticker, future in futures.items():
+                if future.exception() is None:
+                    entries[ticker] = dict(future.result(), fetched=today)
+            self._save()
+
+    def prefetch_in_background(self, tickers):
+        """ Method to start the daily background prefetch (e.g. for the whole ticker universe) once per process """
+        with self._lock:
+            if self._prefetched_on == date.today():
+                return
+            self._prefetched_on = date.today()
+        threading.Thread(target=self.prefetch, args=(list(tickers),), name="metadata-prefetch", daemon=True).start()
+
+    def _refresh(self, ticker):
+        with Instrumentation.stage("download_info"):
+            entry = dict(self.download(ticker), fetched=date.today().isoformat())
+        with self._lock:
+            self._load()[ticker] = entry
+            self._save()
+
+    def get(self, ticker):
+        """ Method to return the fields of a ticker, downloading them only if there is no entry from today
+            sessions asking for the same stale ticker at the same time share one download """
+        stale = self.stale([ticker])
+        Instrumentation.count("metadata_miss" if stale else "metadata_hit")
+        if stale:
+            SingleFlight.shared().do(("info", self.store_path, ticker), self._refresh, ticker)
+        return self.peek(ticker)
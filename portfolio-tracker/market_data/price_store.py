@@ -0,0 +1,184 @@
+# price_store.py
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timezone
+import numpy as np
+import pandas as pd
+from market_data.providers import MarketDataProvider
+from market_data.coordinator import SingleFlight
+from utils.instrumentation import Instrumentation
+
+class PriceStore:
+    """ On-disk OHLCV store (one SQLite file per ticker & interval) that only downloads the date ranges it does not hold yet """
+    store_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "prices")
+    columns = ["Open", "High", "Low", "Close", "Adj Close", "Volume", "Dividends", "Stock Splits"]
+    sql_columns = ["open", "high", "low", "close", "adj_close", "volume", "dividends", "stock_splits"]
+    weekmasks = {"1d": "1111100", "1wk": "1000000"} # days a bar can be dated on (weekdays, Mondays), crypto daily bars every day
+
+    _locks = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, store_dir=None, provider=None):
+        self.store_dir = store_dir or PriceStore.store_dir
+        self.provider = provider or MarketDataProvider.default()
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    @staticmethod
+    def missing_ranges(start, end, covered):
+        """ Method to return the sub ranges of [start, end) not contained in the covered ranges """
+        gaps = []
+        cursor = start
+        for covered_start, covered_end in sorted(covered):
+            if covered_end <= cursor:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+            if cursor >= end:
+                break
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    @staticmethod
+    def merge_ranges(ranges):
+        """ Method to merge overlapping or adjacent date ranges """
+        merged = []
+        for range_start, range_end in sorted(ranges):
+            if merged and range_start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], range_end))
+            else:
+                merged.append((range_start, range_end))
+        return merged
+
+    def _path(self, ticker, interval):
+        suffix = "" if interval == "1d" else f"_{interval}"
+        return os.path.join(self.store_dir, re.sub(r"[^A-Za-z0-9._-]", "_", ticker) + suffix + ".sqlite")
+
+    def _lock(self, ticker, interval):
+        with PriceStore._locks_guard:
+            return PriceStore._locks.setdefault(self._path(ticker, interval), threading.Lock())
+
+    def _connect(self, ticker, interval):
+        connection = sqlite3.connect(self._path(ticker, interval), timeout=30)
+        connection.execute(f"""CREATE TABLE IF NOT EXISTS prices (date TEXT PRIMARY KEY,
+                                                                 {", ".join(f"{column} REAL" for column in PriceStore.sql_columns)})""")
+        connection.execute("CREATE TABLE IF NOT EXISTS coverage (start TEXT NOT NULL, end TEXT NOT NULL)")
+        return connection
+
+    def _read_coverage(self, connection):
+        rows = connection.execute("SELECT start, end FROM coverage").fetchall()
+        return [(date.fromisoformat(start), date.fromisoformat(end)) for start, end in rows]
+
+    def _write(self, connection, frame, covered):
+        """ Method to upsert downloaded bars & store the new coverage in one transaction """
+        with connection:
+            if not frame.empty:
+                rows = frame.reset_index()
+                rows["Date"] = pd.to_datetime(rows[rows.columns[0]]).dt.date.map(date.isoformat)
+                rows = rows.reindex(columns=["Date"] + PriceStore.columns)
+                connection.executemany(f"""INSERT OR REPLACE INTO prices (date, {", ".join(PriceStore.sql_columns)})
+                                           VALUES ({", ".join("?" * (len(PriceStore.sql_columns) + 1))})""",
+                                       rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None))
+            connection.execute("DELETE FROM coverage")
+            connection.executemany("INSERT INTO coverage (start, end) VALUES (?, ?)",
+                                   [(start.isoformat(), end.isoformat()) for start, end in covered])
+
+    @staticmethod
+    def settled_today():
+        """ Method to return the first date whose daily bar may still be running: the UTC date, all exchanges served
+            (Americas, Europe, Asia & crypto at 00:00 UTC) close their session of a date before that date ends in UTC """
+        return datetime.now(timezone.utc).date()
+
+    @staticmethod
+    def expects_bars(ticker, start, end, interval):
+        """ Method to check if [start, end) holds a date the interval dates bars on, by weekday only (holidays expect bars) """
+        if interval == "1mo":
+            return start.day == 1 or date(start.year + start.month // 12, start.month % 12 + 1, 1) < end
+        weekmask = "1111111" if interval == "1d" and ticker.endswith("-USD") else PriceStore.weekmasks.get(interval)
+        return weekmask is None or end > start and np.busday_count(start, end, weekmask=weekmask) > 0
+
+    def top_up(self, ticker, start, end, interval="1d", settled=None):
+        """ Method to download only the head/tail (or holes) of [start, end) missing on disk
+            settled: bars before this date are complete & marked as covered (default: PriceStore.settled_today) """
+        settled = settled or PriceStore.settled_today()
+        with self._lock(ticker, interval):
+            connection = self._connect(ticker, interval)
+            try:
+                covered = self._read_coverage(connection)
+                gaps = PriceStore.missing_ranges(start, end, covered)
+                Instrumentation.count("price_store_miss" if gaps else "price_store_hit")
+                for gap_start, gap_end in gaps:
+                    frame = self._download(ticker, gap_start, gap_end, interval)
+                    if self._split_after_stored(connection, frame):
+                        self._reset(connection, ticker, start, end, interval, settled)
+                        return
+                    covered = self._cover(covered, ticker, frame, gap_start, gap_end, interval, settled)
+                    self._write(connection, frame, covered)
+            finally:
+                connection.close()
+
+    def _download(self, ticker, start, end, interval):
+        with Instrumentation.stage("download_history"):
+            frame = self.provider.history(ticker, start, end, interval)
+        if Instrumentation.enabled:
+            Instrumentation.count("history_downloads")
+            Instrumentation.count("bytes_fetched", int(frame.memory_usage(index=True).sum()))
+        return frame
+
+    @staticmethod
+    def _cover(covered, ticker, frame, start, end, interval, settled):
+        """ Method to add a downloaded range to the coverage, up to the settled date (a running bar is never complete).
+            yfinance returns an empty frame on errors & rate limits, so an empty range only counts if no bar can fall into it """
+        covered_end = min(end, settled)
+        if covered_end <= start:
+            return covered
+        if frame.empty and PriceStore.expects_bars(ticker, start, covered_end, interval):
+            Instrumentation.count("empty_downloads") # failure or holiday, downloaded again by the next request
+            return covered
+        return PriceStore.merge_ranges(covered + [(start, covered_end)])
+
+    @staticmethod
+    def _split_after_stored(connection, frame):
+        """ Method to check if a download holds a split dated after stored bars, the provider adjusts prices & volumes
+            before a split after the fact, so the stored bars no longer match the new ones """
+        if frame.empty or "Stock Splits" not in frame.columns:
+            return False
+        splits = frame.index[frame["Stock Splits"].fillna(0).to_numpy() != 0]
+        if len(splits) == 0:
+            return False
+        last_split = pd.Timestamp(splits.max()).date().isoformat()
+        return connection.execute("SELECT 1 FROM prices WHERE date < ? LIMIT 1", (last_split,)).fetchone() is not None
+
+    def _reset(self, connection, ticker, start, end, interval, settled):
+        """ Method to drop all stored bars & coverage of the ticker & download [start, end) again in split adjusted terms """
+        Instrumentation.count("split_resets")
+        with connection:
+            connection.execute("DELETE FROM prices")
+            connection.execute("DELETE FROM coverage")
+        frame = self._download(ticker, start, end, interval)
+        self._write(connection, frame, self._cover([], ticker, frame, start, end, interval, settled))
+
+    def get_history(self, ticker, start, end, interval="1d", settled=None):
+        """ Method to return bars (daily or coarser) for [start, end) with a 'Date' column, served from disk after top-up
+            identical requests of concurrent sessions share one top-up & read, the frame must not be modified """
+        return SingleFlight.shared().do(("history", self.store_dir, ticker, interval, start, end, settled), self._read_history,
+                                        ticker, start, end, interval, settled)
+
+    def _read_history(self, ticker, start, end, interval, settled):
+        self.top_up(ticker, start, end, interval, settled)
+        connection = self._connect(ticker, interval)
+        try:
+            with Instrumentation.stage("read_history"):
+                history = pd.read_sql_query(f"""SELECT date, {", ".join(PriceStore.sql_columns)} FROM prices
+                                                WHERE date >= ? AND date < ? ORDER BY date""",
+                                            connection, params=(start.isoformat(), end.isoformat()))
+        finally:
+            connection.close()
+        history.columns = ["Date"] + PriceStore.columns
+        history["Date"] = pd.to_datetime(history["Date"]).dt.date
+        return history
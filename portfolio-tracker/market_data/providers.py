@@ -0,0 +1,178 @@
+# providers.py
+import os
+import pickle
+import re
+import threading
+import zlib
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+class MarketDataProvider:
+    """ Interface behind every download of the app, frames are shaped like the yfinance results """
+    intraday_window = {"1m": timedelta(days=7), "5m": timedelta(days=60), "1h": timedelta(days=730)}   # longest span per request
+    intraday_lookback = {"1m": timedelta(days=30), "5m": timedelta(days=60), "1h": timedelta(days=730)} # bars older than this are not served
+
+    _default = None
+    _default_guard = threading.Lock()
+
+    def history(self, ticker, start, end, interval="1d"):
+        """ Method to return OHLCV bars (incl. Dividends & Stock Splits events) for [start, end) indexed by a tz aware 'Date' index """
+        raise NotImplementedError
+
+    def info(self, ticker):
+        """ Method to return the metadata dict of a ticker (shortName, currency, trailingPE, ...) """
+        raise NotImplementedError
+
+    def earliest(self, interval):
+        """ Method to return the first day bars of an interval are served for, None if there is no limit """
+        lookback = self.intraday_lookback.get(interval)
+        return None if lookback is None else date.today() - lookback + timedelta(days=1) # the limit counts from now
+
+    def chunks(self, start, end, interval):
+        """ Method to split [start, end) into request windows within the provider limits of the interval """
+        window = self.intraday_window.get(interval)
+        if window is None:
+            return [(start, end)]
+        start = max(start, self.earliest(interval))
+        return [(chunk_start, min(chunk_start + window, end)) for chunk_start in (start + window * i for i in range(-(-(end - start) // window)))]
+
+    @classmethod
+    def default(cls):
+        """ Method to return the process wide provider, PT_DATA_PROVIDER=synthetic runs the app offline """
+        with cls._default_guard:
+            if cls._default is None:
+                cls._default = SyntheticProvider() if os.environ.get("PT_DATA_PROVIDER") == "synthetic" else YahooProvider()
+            return cls._default
+
+    @classmethod
+    def use(cls, provider):
+        """ Method to replace the process wide provider (e.g. for benchmarks) """
+        with cls._default_guard:
+            cls._default = provider
+
+class YahooProvider(MarketDataProvider):
+    """ Provider backed by yfinance """
+
+    def history(self, ticker, start, end, interval="1d"):
+        return yf.Ticker(ticker).history(start=start, end=end, interval=interval, auto_adjust=False)
+
+    def info(self, ticker):
+        return yf.Ticker(ticker).info
+
+class SyntheticProvider(MarketDataProvider):
+    """ Deterministic offline provider: random walks seeded by ticker, identical bars for overlapping windows """
+    origin = date(1980, 1, 1) # every path starts here so a date always gets the same bar
+    frequencies = {"1d": "B", "1wk": "W-MON", "1mo": "MS"}
+    intraday_minutes = {"1m": 1, "5m": 5, "1h": 60}
+    session = (9 * 60 + 30, 16 * 60) # local minutes of the regular session, crypto & fx trade around the clock
+    suffix_currencies = {".T": "JPY", ".PA": "EUR", ".DE": "EUR", ".SW": "CHF", ".L": "GBp"}
+    fx_levels = {"EUR": 0.9, "JPY": 140.0, "CHF": 0.9, "GBP": 0.8}
+
+    def __init__(self, timezone="America/New_York"):
+        self.timezone = timezone
+
+    @staticmethod
+    def _rng(*parts):
+        """ Method to return a generator seeded by the parts, one per field so draws do not depend on the window length """
+        return np.random.default_rng(zlib.crc32("|".join(parts).encode()))
+
+    def currency(self, ticker):
+        """ Method to derive the currency from the ticker suffix """
+        if ticker.endswith("-USD"):
+            return "USD"
+        return next((ccy for suffix, ccy in SyntheticProvider.suffix_currencies.items() if ticker.endswith(suffix)), "USD")
+
+    def _intraday(self, ticker, start, end, interval):
+        """ Method to split each daily bar into a Brownian bridge from its open to its close, seeded per day """
+        step = SyntheticProvider.intraday_minutes[interval]
+        first, last = SyntheticProvider.session if not ticker.endswith(("-USD", "=X")) else (0, 24 * 60)
+        offsets = np.arange(first, last, step)
+        days = self.history(ticker, pd.Timestamp(start).date(), pd.Timestamp(end).date() + timedelta(days=1), "1d")
+        blocks = []
+        for day, bar in days.iterrows():
+            rng = SyntheticProvider._rng(ticker, interval, day.date().isoformat())
+            path = np.cumsum(rng.normal(0, np.log(bar["High"] / bar["Low"]) / 2 / np.sqrt(len(offsets)), len(offsets)))
+            path += np.linspace(1 / len(offsets), 1, len(offsets)) * (np.log(bar["Close"] / bar["Open"]) - path[-1]) # ends at the close
+            close = bar["Open"] * np.exp(path)
+            open_ = np.r_[bar["Open"], close[:-1]]
+            spread = np.abs(rng.normal(0, 0.0005, len(offsets)))
+            share = rng.random(len(offsets))
+            blocks.append(pd.DataFrame({"Open": open_,
+                                        "High": np.maximum(open_, close) * (1 + spread),
+                                        "Low": np.minimum(open_, close) * (1 - spread),
+                                        "Close": close,
+                                        "Adj Close": close,
+                                        "Volume": np.round(bar["Volume"] * share / share.sum()),
+                                        "Dividends": np.r_[bar["Dividends"], np.zeros(len(offsets) - 1)], # paid on the first bar of the day
+                                        "Stock Splits": 0.0},
+                                       index=pd.DatetimeIndex(day + pd.to_timedelta(offsets, unit="m"), name="Datetime")))
+        columns = ["Open", "High", "Low", "Close", "Adj Close", "Volume", "Dividends", "Stock Splits"]
+        bars = pd.concat(blocks) if blocks else pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name="Datetime", tz=self.timezone))
+        return bars.loc[(bars.index >= pd.Timestamp(start).tz_localize(self.timezone)) & (bars.index < pd.Timestamp(end).tz_localize(self.timezone))]
+
+    def history(self, ticker, start, end, interval="1d"):
+        if interval in SyntheticProvider.intraday_minutes:
+            return self._intraday(ticker, start, end, interval)
+        if interval not in SyntheticProvider.frequencies:
+            raise ValueError(f"Interval {interval} is not supported by the synthetic provider")
+        if interval == "1d": # numpy calendar, pd.date_range with business days is slow for decades of bars
+            days = np.arange(np.datetime64(SyntheticProvider.origin), np.datetime64(pd.Timestamp(end).date()), dtype="datetime64[D]")
+            index = pd.DatetimeIndex(days if ticker.endswith("-USD") else days[np.is_busday(days)], name="Date") # crypto trades 24/7
+        else:
+            index = pd.date_range(SyntheticProvider.origin, end, freq=SyntheticProvider.frequencies[interval], inclusive="left", name="Date")
+        rng = SyntheticProvider._rng(ticker, interval, "parameters")
+        level = SyntheticProvider.fx_levels.get(ticker[:3], 1.0) if ticker.endswith("=X") else rng.uniform(10, 500)
+        volatility = 0.002 if ticker.endswith("=X") else rng.uniform(0.005, 0.03)
+        drift = 0.0 if ticker.endswith("=X") else 0.0002 # fx rates stay around their level
+        close = level * np.exp(np.cumsum(SyntheticProvider._rng(ticker, interval, "close").normal(drift, volatility, len(index))))
+        open_ = close * np.exp(SyntheticProvider._rng(ticker, interval, "open").normal(0, volatility / 2, len(index)))
+        spread = np.abs(SyntheticProvider._rng(ticker, interval, "spread").normal(0, volatility, len(index)))
+        volume = SyntheticProvider._rng(ticker, interval, "volume").integers(10 ** 5, 10 ** 7, len(index)).astype(float)
+        months = index.year * 12 + index.month
+        payday = np.r_[True, months[1:] != months[:-1]] & (index.month % 3 == 2) # first bar of Feb, May, Aug & Nov
+        dividends = np.where(payday, close * SyntheticProvider._rng(ticker, interval, "dividends").uniform(0.001, 0.01, len(index)), 0.0)
+        bars = pd.DataFrame({"Open": open_,
+                             "High": np.maximum(open_, close) * (1 + spread),
+                             "Low": np.minimum(open_, close) * (1 - spread),
+                             "Close": close,
+                             "Adj Close": close,
+                             "Volume": 0.0 if ticker.endswith("=X") else volume,
+                             "Dividends": 0.0 if ticker.endswith("-USD") or ticker.endswith("=X") else dividends,
+                             "Stock Splits": 0.0}, index=index)
+        bars = bars.loc[pd.Timestamp(start):]
+        bars.index = bars.index.tz_localize(self.timezone)
+        return bars
+
+    def info(self, ticker):
+        rng = SyntheticProvider._rng(ticker, "info")
+        return {"shortName": f"Synthetic {ticker}",
+                "currency": self.currency(ticker),
+                "trailingPE": None if ticker.endswith("-USD") else float(rng.uniform(5, 60))}
+
+class FixtureProvider(MarketDataProvider):
+    """ Replays recorded responses from a directory, missing ones are recorded from the source provider if given """
+
+    def __init__(self, directory, source=None):
+        self.directory = directory
+        self.source = source
+        os.makedirs(directory, exist_ok=True)
+
+    def _replay(self, name, record):
+        path = os.path.join(self.directory, re.sub(r"[^A-Za-z0-9._-]", "_", name) + ".pkl")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        if self.source is None:
+            raise FileNotFoundError(f"No fixture recorded for {name}")
+        response = record()
+        with open(path, "wb") as f:
+            pickle.dump(response, f)
+        return response
+
+    def history(self, ticker, start, end, interval="1d"):
+        return self._replay(f"history_{ticker}_{start}_{end}_{interval}", lambda: self.source.history(ticker, start, end, interval))
+
+    def info(self, ticker):
+        return self._replay(f"info_{ticker}", lambda: self.source.info(ticker))
@@ -0,0 +1,142 @@
+# universe.py
+import json
+import os
+import re
+import sqlite3
+import threading
+
+class TickerUniverse:
+    """ Ticker universe (ticker -> friendly name) in an indexed SQLite file built from ticker_names.json on first use.
+        Prefix search on ticker & name, fuzzy search by shared trigrams, nothing of the universe is held in memory. """
+    source_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ticker_names", "ticker_names.json")
+    index_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "universe.sqlite")
+    limit = 50        # results per search, keeps the selector small whatever the universe size
+    min_overlap = 0.3 # share of the query trigrams a fuzzy match must contain
+
+    _shared = None
+    _shared_guard = threading.Lock()
+
+    def __init__(self, source_path=None, index_path=None):
+        self.source_path = source_path or TickerUniverse.source_path
+        self.index_path = index_path or TickerUniverse.index_path
+        self._ready = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """ Method to return the universe shared by all sessions """
+        with cls._shared_guard:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def normalize(text):
+        """ Method to lower case text & reduce it to letters, digits & single spaces """
+        return " ".join(re.sub(r"[^0-9a-z]+", " ", text.lower()).split())
+
+    @staticmethod
+    def trigrams(text):
+        """ Method to split normalized text into its distinct trigrams, word boundaries included """
+        padded = f" {text} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def _build(self):
+        """ Method to write the index next to the old one & swap it in, sessions keep reading the old file meanwhile """
+        with open(self.source_path, "r", encoding="utf-8") as f:
+            names = json.load(f)
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        connection = sqlite3.connect(temp_path)
+        try:
+            with connection:
+                connection.execute("""CREATE TABLE tickers (position INTEGER PRIMARY KEY, ticker TEXT NOT NULL UNIQUE, name TEXT NOT NULL,
+                                                            ticker_key TEXT NOT NULL, name_key TEXT NOT NULL)""")
+                connection.execute("CREATE TABLE trigrams (gram TEXT NOT NULL, position INTEGER NOT NULL, PRIMARY KEY (gram, position)) WITHOUT ROWID")
+                rows = [(position, ticker, name, TickerUniverse.normalize(ticker), TickerUniverse.normalize(name))
+                        for position, (ticker, name) in enumerate(names.items())]
+                connection.executemany("INSERT INTO tickers VALUES (?, ?, ?, ?, ?)", rows)
+                connection.executemany("INSERT INTO trigrams VALUES (?, ?)",
+                                       ((gram, position) for position, _, _, ticker_key, name_key in rows
+                                        for gram in TickerUniverse.trigrams(ticker_key) | TickerUniverse.trigrams(name_key)))
+                connection.execute("CREATE INDEX ticker_keys ON tickers (ticker_key)")
+                connection.execute("CREATE INDEX name_keys ON tickers (name_key)")
+                connection.execute("CREATE TABLE source (mtime REAL NOT NULL)")
+                connection.execute("INSERT INTO source VALUES (?)", (os.path.getmtime(self.source_path),))
+        finally:
+            connection.close()
+        os.replace(temp_path, self.index_path)
+
+    def _current(self):
+        """ Method to check that the index exists & was built from the current ticker_names.json """
+        if not os.path.exists(self.index_path):
+            return False
+        connection = sqlite3.connect(self.index_path)
+        try:
+            return connection.execute("SELECT mtime FROM source").fetchone()[0] == os.path.getmtime(self.source_path)
+        except sqlite3.Error:
+            return False
+        finally:
+            connection.close()
+
+    def _connect(self):
+        with self._lock: # first use of the process checks (& if needed builds) the index once
+            if not self._ready:
+                if not self._current():
+                    self._build()
+                self._ready = True
+        return sqlite3.connect(self.index_path)
+
+    def _query(self, sql, params=()):
+        connection = self._connect()
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM tickers")[0][0]
+
+    def tickers(self):
+        """ Method to return all tickers in the order of ticker_names.json """
+        return [ticker for ticker, in self._query("SELECT ticker FROM tickers ORDER BY position")]
+
+    def default(self, limit=None):
+        """ Method to return the first tickers of ticker_names.json (shown before anything is searched) """
+        return [ticker for ticker, in self._query("SELECT ticker FROM tickers ORDER BY position LIMIT ?", (limit or TickerUniverse.limit,))]
+
+    def last(self):
+        """ Method to return the last ticker of ticker_names.json (default of the second asset) """
+        row = self._query("SELECT ticker FROM tickers ORDER BY position DESC LIMIT 1")
+        return row[0][0] if row else None
+
+    def name(self, ticker, default="Unknown"):
+        """ Method to return the friendly name of a ticker """
+        row = self._query("SELECT name FROM tickers WHERE ticker = ?", (ticker,))
+        return row[0][0] if row else default
+
+    def search(self, query, limit=None):
+        """ Method to return tickers matching the query, ranked: ticker prefix (exact first), name prefix, then fuzzy by trigrams """
+        limit = limit or TickerUniverse.limit
+        key = TickerUniverse.normalize(query)
+        if not key:
+            return self.default(limit)
+        grams = sorted(TickerUniverse.trigrams(key))
+        connection = self._connect()
+        try:
+            matches = connection.execute("""SELECT ticker FROM tickers WHERE ticker_key >= ? AND ticker_key < ?
+                                            ORDER BY length(ticker_key), position LIMIT ?""", (key, key + "\uffff", limit)).fetchall()
+            matches += connection.execute("""SELECT ticker FROM tickers WHERE name_key >= ? AND name_key < ?
+                                             ORDER BY position LIMIT ?""", (key, key + "\uffff", limit)).fetchall()
+            if len(dict.fromkeys(matches)) < limit: # fuzzy only to fill up
+                matches += connection.execute(f"""SELECT tickers.ticker FROM (SELECT position, COUNT(*) AS hits FROM trigrams
+                                                                             WHERE gram IN ({", ".join("?" * len(grams))})
+                                                                             GROUP BY position HAVING hits >= ?
+                                                                             ORDER BY hits DESC, position LIMIT ?) AS fuzzy
+                                                  JOIN tickers ON tickers.position = fuzzy.position ORDER BY fuzzy.hits DESC, fuzzy.position""",
+                                              (*grams, max(1, round(len(grams) * TickerUniverse.min_overlap)), limit)).fetchall()
+        finally:
+            connection.close()
+        return list(dict.fromkeys(ticker for ticker, in matches))[:limit]
@@ -0,0 +1,5 @@
+# conftest.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # modules import relative to portfolio-tracker/
@@ -0,0 +1,39 @@
+# test_engine.py
+import numpy as np
+import pandas as pd
+from analytics.engine import AnalyticsEngine
+from market_data.asset_frame import AssetFrame
+
+infos = {"AAA": {"shortName": "A", "currency": "USD", "trailingPE": 10.0},
+         "BBB": {"shortName": "B", "currency": "USD", "trailingPE": np.nan}}
+
+def frame(days):
+    dates = pd.bdate_range("2024-01-01", periods=days)
+    rng = np.random.default_rng(0)
+    histories = {ticker: pd.DataFrame({"Date": dates.date, "Close": 100 * np.cumprod(1 + rng.normal(0, 0.01, days)), "Volume": 1.0, "Dividends": 0.0})
+                 for ticker in infos}
+    return AssetFrame.from_histories(list(infos), ["USD", "USD"], histories, ["Close", "Volume", "Dividends"])
+
+def test_window_without_bars_gives_nan_metrics():
+    result = AnalyticsEngine.compute(frame(0), infos, "Close", [0.0, None])
+    assert len(result.dates) == 0
+    assert (result.observations == 0).all()
+    for metric in (result.geo_return, result.volatility, result.dividend_yield, result.sharpe, result.correlation):
+        assert np.isnan(metric).all()
+
+def test_metrics_match_pandas():
+    bars = frame(250)
+    result = AnalyticsEngine.compute(bars, infos, "Close", [0.0, 0.0])
+    returns = pd.DataFrame(bars.column("Close")).pct_change()
+    np.testing.assert_allclose(result.geo_return, bars.column("Close")[-1] / bars.column("Close")[0] - 1)
+    np.testing.assert_allclose(result.volatility, returns.std() * np.sqrt(249))
+    np.testing.assert_allclose(result.correlation, returns.corr())
+
+def test_periods_per_year_follow_each_calendar():
+    days = pd.date_range("2023-01-01", "2024-12-31", freq="D")
+    weekdays = days[days.dayofweek < 5]
+    histories = {"AAA": pd.DataFrame({"Date": weekdays.date, "Close": 100.0, "Volume": 1.0, "Dividends": 0.0}),
+                 "BTC-USD": pd.DataFrame({"Date": days.date, "Close": 100.0, "Volume": 1.0, "Dividends": 0.0})}
+    bars = AssetFrame.from_histories(list(histories), ["USD", "USD"], histories, ["Close", "Volume", "Dividends"])
+    result = AnalyticsEngine.compute(bars, {"AAA": infos["AAA"], "BTC-USD": infos["BBB"]}, "Close", [0.0, 0.0])
+    np.testing.assert_allclose(result.periods_per_year, [261, 365.25], rtol=0.01)
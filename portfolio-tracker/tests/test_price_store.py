@@ -0,0 +1,55 @@
+# test_price_store.py
+from datetime import date, timedelta
+import pandas as pd
+from market_data.price_store import PriceStore
+
+class RecordingProvider:
+    """ Provider returning flat bars on weekdays (or nothing while failing) & recording each request """
+    def __init__(self, failing=False, split=None):
+        self.failing = failing
+        self.split = split
+        self.requests = []
+
+    def history(self, ticker, start, end, interval="1d"):
+        self.requests.append((start, end))
+        if self.failing:
+            return pd.DataFrame(columns=PriceStore.columns)
+        index = pd.date_range(start, end, freq="B", inclusive="left", name="Date")
+        bars = pd.DataFrame({column: 0.0 if column in ("Dividends", "Stock Splits") else 100.0 for column in PriceStore.columns}, index=index)
+        if self.split is not None:
+            bars.loc[bars.index < pd.Timestamp(self.split), ["Open", "High", "Low", "Close", "Adj Close"]] = 50.0
+            bars.loc[bars.index == pd.Timestamp(self.split), "Stock Splits"] = 2.0
+        return bars
+
+def coverage(store, ticker):
+    connection = store._connect(ticker, "1d")
+    try:
+        return store._read_coverage(connection)
+    finally:
+        connection.close()
+
+def test_failed_download_is_not_covered(tmp_path):
+    provider = RecordingProvider(failing=True)
+    store = PriceStore(str(tmp_path), provider)
+    store.top_up("X", date(2026, 10, 12), date(2026, 10, 16), settled=date(2026, 10, 18))
+    assert coverage(store, "X") == []
+    provider.failing = False
+    store.top_up("X", date(2026, 10, 12), date(2026, 10, 16), settled=date(2026, 10, 18))
+    assert provider.requests == [(date(2026, 10, 12), date(2026, 10, 16))] * 2
+    assert coverage(store, "X") == [(date(2026, 10, 12), date(2026, 10, 16))]
+
+def test_empty_weekend_is_covered_up_to_the_settled_date(tmp_path):
+    store = PriceStore(str(tmp_path), RecordingProvider(failing=True))
+    store.top_up("X", date(2026, 10, 17), date(2026, 10, 19), settled=date(2026, 10, 18))
+    assert coverage(store, "X") == [(date(2026, 10, 17), date(2026, 10, 18))]
+    store.top_up("BTC-USD", date(2026, 10, 17), date(2026, 10, 19), settled=date(2026, 10, 18)) # trades on weekends
+    assert coverage(store, "BTC-USD") == []
+
+def test_split_reloads_the_stored_history(tmp_path):
+    provider = RecordingProvider()
+    store = PriceStore(str(tmp_path), provider)
+    store.get_history("X", date(2024, 1, 1), date(2024, 3, 1))
+    provider.split = date(2024, 3, 4)
+    history = store.get_history("X", date(2024, 1, 1), date(2024, 4, 1))
+    assert provider.requests[-1] == (date(2024, 1, 1), date(2024, 4, 1))
+    assert (history.set_index("Date")["Close"] == [50.0 if day < provider.split else 100.0 for day in history["Date"]]).all()
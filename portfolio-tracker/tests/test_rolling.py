@@ -0,0 +1,37 @@
+# test_rolling.py
+import numpy as np
+import pandas as pd
+from analytics.rolling import RollingRisk
+
+def brute_max_drawdown(prices, window):
+    """ Method to take the max drawdown of every trailing window directly, O(T * window) """
+    filled = pd.DataFrame(prices).ffill().to_numpy()
+    result = np.full(filled.shape, np.nan)
+    for t in range(len(filled)):
+        for j in range(filled.shape[1]):
+            window_prices = filled[max(t - window + 1, 0):t + 1, j]
+            window_prices = window_prices[~np.isnan(window_prices)]
+            if len(window_prices):
+                result[t, j] = np.min(window_prices / np.maximum.accumulate(window_prices)) - 1
+    return result
+
+def test_max_drawdown_forgets_highs_outside_the_window():
+    max_drawdown = RollingRisk.compute([[100], [50], [50], [50], [50], [50]], 3).max_drawdown
+    np.testing.assert_allclose(max_drawdown.ravel(), [0, -0.5, -0.5, 0, 0, 0])
+
+def test_max_drawdown_matches_brute_force_in_one_pass_and_extended():
+    rng = np.random.default_rng(0)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, (300, 3)), axis=0))
+    prices[rng.random(prices.shape) < 0.1] = np.nan
+    for window in (1, 5, 20, 60):
+        expected = brute_max_drawdown(prices, window)
+        np.testing.assert_allclose(RollingRisk.compute(prices, window).max_drawdown, expected)
+        rolling = RollingRisk(window)
+        blocks = [rolling.extend(block).max_drawdown for block in np.split(prices, [3, 50, 51, 200])]
+        np.testing.assert_allclose(np.vstack(blocks), expected)
+
+def test_volatility_matches_pandas():
+    rng = np.random.default_rng(1)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (500, 2)), axis=0))
+    expected = pd.DataFrame(prices).pct_change().rolling(20, min_periods=10).std().to_numpy() * np.sqrt(252)
+    np.testing.assert_allclose(RollingRisk.compute(prices, 20).volatility, expected)
@@ -0,0 +1,27 @@
+# test_warm_cache.py
+from datetime import date, datetime, timezone
+from warm_cache import CacheWarmer
+from market_data.price_store import PriceStore
+from market_data.providers import SyntheticProvider
+
+class CountingProvider(SyntheticProvider):
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def history(self, ticker, start, end, interval="1d"):
+        self.requests.append((start, end))
+        return super().history(ticker, start, end, interval)
+
+def test_settled_after_the_close_of_a_region():
+    assert CacheWarmer.settled("US", datetime(2026, 10, 13, 19, 0, tzinfo=timezone.utc)) == date(2026, 10, 13)  # 15:00 New York
+    assert CacheWarmer.settled("US", datetime(2026, 10, 13, 20, 40, tzinfo=timezone.utc)) == date(2026, 10, 14) # 16:40 New York
+    assert CacheWarmer.settled("crypto", datetime(2026, 10, 14, 0, 30, tzinfo=timezone.utc)) == date(2026, 10, 14)
+
+def test_warmed_session_is_not_downloaded_again(tmp_path):
+    provider = CountingProvider()
+    store = PriceStore(str(tmp_path), provider)
+    store.get_history("AAPL", date(2026, 9, 1), date(2026, 10, 14), settled=CacheWarmer.settled("US", datetime(2026, 10, 13, 20, 40, tzinfo=timezone.utc)))
+    provider.requests.clear()
+    store.get_history("AAPL", date(2026, 9, 1), date(2026, 10, 14)) # next morning's page request
+    assert provider.requests == []
@@ -0,0 +1,83 @@
+# cache.py
+import threading
+import time
+from collections import OrderedDict
+from utils.instrumentation import Instrumentation
+
+class ResultCache:
+    """ Thread safe LRU cache with a TTL per entry & an entry/byte bound, one shared instance per process """
+    max_entries = 128
+    max_bytes = 256 * 1024 ** 2
+
+    _missing = object()
+    _shared = None
+    _shared_guard = threading.Lock()
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries or ResultCache.max_entries
+        self.max_bytes = max_bytes or ResultCache.max_bytes
+        self._entries = OrderedDict() # key -> (expires_at, size, value), oldest first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def shared(cls):
+        """ Method to return the cache shared by all sessions (modules outlive streamlit reruns, page scripts do not) """
+        with cls._shared_guard:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _pop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _, _) in self._entries.items() if expires_at <= now]:
+            self._pop(key)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._pop(next(iter(self._entries)))
+
+    def get(self, key, default=None):
+        """ Method to return a live entry (marking it as recently used) or default """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._pop(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, ttl, size=0):
+        """ Method to store a value for ttl seconds, values larger than the byte bound are not stored """
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            self._evict()
+
+    def get_or_compute(self, key, compute, ttl, sizeof=None):
+        """ Method to return the cached value or compute & store it, cached values must be treated as read only """
+        value = self.get(key, ResultCache._missing)
+        Instrumentation.count("result_cache_miss" if value is ResultCache._missing else "result_cache_hit")
+        if value is ResultCache._missing:
+            value = compute()
+            self.put(key, value, ttl, sizeof(value) if sizeof else 0)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
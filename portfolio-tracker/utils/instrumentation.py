@@ -0,0 +1,158 @@
+# instrumentation.py
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import pandas as pd
+
+class Run:
+    """ Timers per stage & counters of one page run, stages of concurrent requests add up """
+    def __init__(self, name):
+        self.name = name
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.stages = {}   # stage -> [calls, seconds], in order of first use
+        self.counters = {} # event -> value (cache hits/misses, bytes fetched, ...)
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage, seconds):
+        with self._lock:
+            totals = self.stages.setdefault(stage, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def add(self, counter, value=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def merge(self, other):
+        """ Method to add the stages & counters of another run (process totals) """
+        for stage, (calls, seconds) in other.stages.items():
+            with self._lock:
+                totals = self.stages.setdefault(stage, [0, 0.0])
+                totals[0] += calls
+                totals[1] += seconds
+        for counter, value in other.counters.items():
+            self.add(counter, value)
+
+    def record(self):
+        """ Method to return the run as a JSON serializable dict """
+        with self._lock:
+            return {"timestamp": self.timestamp,
+                    "run": self.name,
+                    "seconds": time.perf_counter() - self.started if self.seconds is None else self.seconds,
+                    "stages": {stage: {"calls": calls, "seconds": seconds} for stage, (calls, seconds) in self.stages.items()},
+                    "counters": dict(self.counters)}
+
+    def table(self):
+        """ Method to return the stage breakdown as a frame for the page """
+        record = self.record()
+        return pd.DataFrame([{"Stage": stage, "Calls": values["calls"], "Seconds": round(values["seconds"], 4)}
+                             for stage, values in record["stages"].items()]
+                            + [{"Stage": "total (wall clock)", "Calls": 1, "Seconds": round(record["seconds"], 4)}])
+
+class Instrumentation:
+    """ Lightweight per stage timing of page runs, enabled by PT_INSTRUMENTATION=1. Each run is appended to a JSON lines log
+        & process totals are written in the Prometheus text format (node exporter textfile collector). Disabled, every hook
+        is a flag check. """
+    enabled = os.environ.get("PT_INSTRUMENTATION", "") not in ("", "0")
+    cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+    log_path = os.environ.get("PT_INSTRUMENTATION_LOG", os.path.join(cache_dir, "instrumentation.jsonl"))
+    metrics_path = os.environ.get("PT_METRICS_PATH", os.path.join(cache_dir, "metrics.prom"))
+    prefix = "portfolio_tracker"
+
+    _current = contextvars.ContextVar("instrumentation_run", default=None)
+    _null = contextlib.nullcontext()
+    _totals = Run("process")
+    _runs = 0
+    _write_lock = threading.Lock()
+
+    @staticmethod
+    def current():
+        """ Method to return the run of the calling context, None if disabled or outside a run """
+        return Instrumentation._current.get() if Instrumentation.enabled else None
+
+    @staticmethod
+    def run(name):
+        """ Context manager around a page run, inside another run it only adds a stage """
+        if not Instrumentation.enabled:
+            return Instrumentation._null
+        if Instrumentation._current.get() is not None:
+            return Instrumentation._timed(name)
+        return Instrumentation._run(name)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _run(name):
+        run = Run(name)
+        token = Instrumentation._current.set(run)
+        try:
+            yield run
+        finally:
+            Instrumentation._current.reset(token)
+            run.seconds = time.perf_counter() - run.started
+            Instrumentation.finish(run)
+
+    @staticmethod
+    def stage(name):
+        """ Context manager timing a stage of the current run """
+        if not Instrumentation.enabled or Instrumentation._current.get() is None:
+            return Instrumentation._null
+        return Instrumentation._timed(name)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _timed(name):
+        run = Instrumentation._current.get()
+        start = time.perf_counter()
+        try:
+            yield run
+        finally:
+            run.add_stage(name, time.perf_counter() - start)
+
+    @staticmethod
+    def count(counter, value=1):
+        """ Method to add to a counter of the current run """
+        if Instrumentation.enabled:
+            run = Instrumentation._current.get()
+            if run is not None:
+                run.add(counter, value)
+
+    @staticmethod
+    def bind(function):
+        """ Method to carry the current run into a function executed on another thread (e.g. the fetch pool) """
+        if not Instrumentation.enabled or Instrumentation._current.get() is None:
+            return function
+        context = contextvars.copy_context() # one copy per call, a context cannot be entered by two threads at once
+        return lambda *args, **kwargs: context.run(function, *args, **kwargs)
+
+    @staticmethod
+    def prometheus(totals, runs):
+        """ Method to render process totals in the Prometheus text exposition format """
+        prefix = Instrumentation.prefix
+        lines = [f"# HELP {prefix}_runs_total Instrumented page runs", f"# TYPE {prefix}_runs_total counter", f"{prefix}_runs_total {runs}",
+                 f"# HELP {prefix}_stage_seconds_total Time spent per stage", f"# TYPE {prefix}_stage_seconds_total counter"]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{stage}"}} {values["seconds"]:.6f}' for stage, values in totals["stages"].items()]
+        lines += [f"# HELP {prefix}_stage_calls_total Calls per stage", f"# TYPE {prefix}_stage_calls_total counter"]
+        lines += [f'{prefix}_stage_calls_total{{stage="{stage}"}} {values["calls"]}' for stage, values in totals["stages"].items()]
+        lines += [f"# HELP {prefix}_events_total Cache hits/misses, bytes fetched & other counters", f"# TYPE {prefix}_events_total counter"]
+        lines += [f'{prefix}_events_total{{event="{counter}"}} {value}' for counter, value in totals["counters"].items()]
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def finish(run):
+        """ Method to append a finished run to the JSON log & rewrite the Prometheus file with the process totals """
+        Instrumentation._totals.merge(run)
+        with Instrumentation._write_lock:
+            Instrumentation._runs += 1
+            for path in (Instrumentation.log_path, Instrumentation.metrics_path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(Instrumentation.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(run.record()) + "\n")
+            temp_path = f"{Instrumentation.metrics_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(Instrumentation.prometheus(Instrumentation._totals.record(), Instrumentation._runs))
+            os.replace(temp_path, Instrumentation.metrics_path) # scrapers never see a half written file
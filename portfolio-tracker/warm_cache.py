@@ -0,0 +1,130 @@
+# warm_cache.py
+import argparse
+import json
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from market_data.price_store import PriceStore
+from market_data.metadata_store import MetadataStore
+from market_data.fx_service import FXService
+from market_data.universe import TickerUniverse
+
+class CacheWarmer:
+    """ Pre-loads prices (incl. dividends), metadata & fx of the ticker universe so interactive sessions start hot """
+    # region -> (timezone, local run time after the close, trading days only)
+    regions = {"US": ("America/New_York", (16, 30), True),
+               "JP": ("Asia/Tokyo", (16, 0), True),
+               "EU": ("Europe/Berlin", (18, 0), True),
+               "crypto": ("UTC", (0, 30), False)} # daily crypto bars close at midnight UTC, 24/7
+    eu_suffixes = (".PA", ".DE", ".SW", ".L", ".AS", ".MI", ".MC", ".F")
+
+    def __init__(self, years=10, max_workers=8, price_store=None, metadata_store=None):
+        self.years = years
+        self.max_workers = max_workers
+        self.price_store = price_store or PriceStore()
+        self.metadata_store = metadata_store or MetadataStore.shared()
+        self.fx_service = FXService(self.price_store)
+
+    @staticmethod
+    def load_universe(path=None):
+        """ Method to read the tickers from ticker_names.json """
+        with open(path or TickerUniverse.source_path, "r", encoding="utf-8") as f:
+            return list(json.load(f).keys())
+
+    @staticmethod
+    def region(ticker):
+        """ Method to map a ticker to the region whose close settles its daily bar """
+        if ticker.endswith("-USD"):
+            return "crypto"
+        if ticker.endswith(".T"):
+            return "JP"
+        if ticker.endswith(CacheWarmer.eu_suffixes):
+            return "EU"
+        return "US"
+
+    @staticmethod
+    def next_run(region, now):
+        """ Method to return the next (aware) run time of a region after now """
+        zone, (hour, minute), trading_days = CacheWarmer.regions[region]
+        local = now.astimezone(ZoneInfo(zone))
+        run = local.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        while run <= local or (trading_days and run.weekday() >= 5):
+            run += timedelta(days=1) # aware arithmetic keeps the local wall clock time over DST changes
+        return run
+
+    @staticmethod
+    def settled(region, now):
+        """ Method to return the first date whose daily bar is not settled yet in a region: after the run time of a trading region
+            its session of the day has closed, crypto bars close at midnight UTC """
+        zone, (hour, minute), trading_days = CacheWarmer.regions[region]
+        local = now.astimezone(ZoneInfo(zone))
+        closed = trading_days and (local.hour, local.minute) >= (hour, minute)
+        return local.date() + timedelta(days=1) if closed else local.date()
+
+    def _run_all(self, executor, function, items):
+        """ Method to run function for every item on the pool, returning the items that failed """
+        futures = {item: executor.submit(function, *item) for item in items}
+        return [item for item, future in futures.items() if future.exception() is not None]
+
+    def warm(self, tickers, settled=None):
+        """ Method to load everything an analysis of the tickers needs, returns the requests that failed
+            settled: first date whose bar may still be running (default: PriceStore.settled_today), bars before it are stored as complete """
+        end_date = date.today() + timedelta(days=1) # includes today's bar, complete if settled
+        start_date = end_date - timedelta(days=365 * self.years)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="warm") as executor:
+            prices = {ticker: executor.submit(self.price_store.get_history, ticker, start_date, end_date, "1d", settled) for ticker in tickers}
+            self.metadata_store.prefetch(tickers) # in parallel to the prices, currencies are needed for fx
+            currencies = [metadata["currency"] for metadata in map(self.metadata_store.peek, tickers) if metadata is not None]
+            failed = self._run_all(executor, self.fx_service.base_history,
+                                   [(ccy, start_date, end_date) for ccy in FXService.base_currencies(currencies + [FXService.pivot])])
+            failed += [(ticker,) for ticker, future in prices.items() if future.exception() is not None]
+        failed += [(ticker, "info") for ticker in self.metadata_store.stale(tickers)]
+        return failed
+
+    def warm_region(self, region, tickers):
+        """ Method to warm the tickers of one region & report the outcome """
+        selected = [ticker for ticker in tickers if CacheWarmer.region(ticker) == region]
+        start = time.perf_counter()
+        failed = self.warm(selected, CacheWarmer.settled(region, datetime.now(timezone.utc))) # the session that just closed is complete
+        print(f"{datetime.now():%Y-%m-%d %H:%M:%S} warmed {region}: {len(selected)} tickers in {time.perf_counter() - start:.1f}s,"
+              f" {len(failed)} failed {failed if failed else ''}", flush=True)
+
+    def try_warm_region(self, region, tickers):
+        """ Method to warm a region & log (not raise) an unexpected failure (e.g. a locked store), so the schedule keeps running """
+        try:
+            self.warm_region(region, tickers)
+        except Exception:
+            print(f"{datetime.now():%Y-%m-%d %H:%M:%S} warming {region} failed, retried at its next close", flush=True)
+            traceback.print_exc()
+
+    def schedule(self, tickers, regions):
+        """ Method to warm each region after its market close, forever """
+        after = datetime.now(timezone.utc)
+        while True:
+            runs = {region: CacheWarmer.next_run(region, after) for region in regions}
+            region = min(runs, key=runs.get)
+            print(f"next run: {region} at {runs[region]:%Y-%m-%d %H:%M %Z}", flush=True)
+            time.sleep(max((runs[region] - datetime.now(timezone.utc)).total_seconds(), 0))
+            self.try_warm_region(region, tickers)
+            after = runs[region] # a run that overlaps the close of another region delays it instead of skipping it
+
+def main():
+    parser = argparse.ArgumentParser(prog="warm-cache", description="Pre-load market data of the ticker universe into the local caches")
+    parser.add_argument("--schedule", action="store_true", help="Keep running & re-warm each region after its market close")
+    parser.add_argument("--regions", nargs="+", choices=list(CacheWarmer.regions), default=list(CacheWarmer.regions), help="Regions to warm")
+    parser.add_argument("--years", type=int, default=10, help="Years of price history to load")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel downloads")
+    parser.add_argument("--tickers", help="Path to a ticker_names.json (default: the one of the app)")
+    args = parser.parse_args()
+
+    warmer = CacheWarmer(args.years, args.workers)
+    tickers = CacheWarmer.load_universe(args.tickers)
+    for region in args.regions: # always start hot, then follow the schedule
+        (warmer.try_warm_region if args.schedule else warmer.warm_region)(region, tickers)
+    if args.schedule:
+        warmer.schedule(tickers, args.regions)
+
+if __name__=="__main__": # run from the package folder: python warm_cache.py [--schedule]
+    main()